@@ -1,15 +1,22 @@
 from django.contrib import admin
-from .models import PDFDocument, Transaction
+from .models import PDFDocument, Transaction, UploadSession
 
 @admin.register(PDFDocument)
 class PDFDocumentAdmin(admin.ModelAdmin):
-    list_display = ['filename', 'uploaded_at', 'file_size', 'processed']
-    list_filter = ['processed', 'uploaded_at']
-    search_fields = ['filename']
+    list_display = ['filename', 'uploaded_at', 'file_size', 'processed', 'status', 'bank_type', 'account_number',
+                    'balances_verified']
+    list_filter = ['processed', 'status', 'balances_verified', 'uploaded_at']
+    search_fields = ['filename', 'account_number']
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ['date', 'description', 'amount', 'category', 'transaction_type', 'document']
     list_filter = ['category', 'transaction_type', 'date']
     search_fields = ['description']
-    date_hierarchy = 'date'
\ No newline at end of file
+    date_hierarchy = 'date'
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'created_at', 'total_size', 'received_bytes', 'status']
+    list_filter = ['status', 'created_at']
+    search_fields = ['filename']
\ No newline at end of file
@@ -0,0 +1,195 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from django.db import connections
+from django.db.models import CharField, FloatField, QuerySet
+from django.db.models.functions import Cast
+
+# Median interval (days) ranges given a name in recurring payment reports
+FREQUENCIES = [
+    ('weekly', 6, 8),
+    ('biweekly', 13, 16),
+    ('monthly', 27, 33),
+    ('quarterly', 85, 95),
+    ('yearly', 350, 380),
+]
+DAYS_PER_MONTH = 30.44
+
+
+def _empty_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        'date': np.array([], dtype='datetime64[D]'),
+        'amount': np.array([], dtype=np.float64),
+        'category': np.array([], dtype=object),
+        'merchant': np.array([], dtype=object),
+    })
+
+
+def load_transactions(queryset: QuerySet, chunk_size: int = 100000) -> pd.DataFrame:
+    """
+    Load the date, amount, category and merchant columns of a queryset into a
+    DataFrame. The values_list query is read with fetchmany in chunks of
+    `chunk_size` rows, with dates and amounts cast in SQL to text and floats
+    so each chunk converts to NumPy arrays without per-row Python.
+    """
+    rows_queryset = queryset.order_by().annotate(
+        day=Cast('date', CharField()), amount_value=Cast('amount', FloatField())
+    ).values_list('category', 'merchant', 'day', 'amount_value')
+    sql, params = rows_queryset.query.sql_with_params()
+
+    frames = []
+    with connections[rows_queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            categories, merchants, days, amounts = zip(*rows)
+            frames.append(pd.DataFrame({
+                'date': np.array(days, dtype='datetime64[D]'),
+                'amount': np.array(amounts, dtype=np.float64),
+                'category': np.array(categories, dtype=object),
+                'merchant': np.array(merchants, dtype=object),
+            }))
+
+    if not frames:
+        return _empty_frame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def _series(values) -> List[float]:
+    return np.round(np.asarray(values, dtype=np.float64), 2).tolist()
+
+
+def monthly_cash_flow(frame: pd.DataFrame) -> Dict[str, Any]:
+    """Inflow, outflow and net per calendar month, overall and for each category"""
+    if frame.empty:
+        return {'months': [], 'totals': {'inflow': [], 'outflow': [], 'net': []}, 'categories': {}}
+
+    months = frame['date'].values.astype('datetime64[M]')
+    amounts = frame['amount'].values
+    flows = pd.DataFrame({
+        'month': months,
+        'category': frame['category'].values,
+        'inflow': np.where(amounts > 0, amounts, 0.0),
+        'outflow': np.where(amounts < 0, -amounts, 0.0),
+    }).groupby(['category', 'month'])[['inflow', 'outflow']].sum()
+
+    # Every month in the range, including months without transactions
+    month_range = np.arange(months.min(), months.max() + np.timedelta64(1, 'M'))
+    categories = sorted(flows.index.get_level_values('category').unique())
+    flows = flows.reindex(pd.MultiIndex.from_product([categories, month_range], names=['category', 'month']),
+                          fill_value=0.0)
+    inflow = flows['inflow'].values.reshape(len(categories), len(month_range))
+    outflow = flows['outflow'].values.reshape(len(categories), len(month_range))
+
+    return {
+        'months': [str(month) for month in month_range],
+        'totals': {
+            'inflow': _series(inflow.sum(axis=0)),
+            'outflow': _series(outflow.sum(axis=0)),
+            'net': _series(inflow.sum(axis=0) - outflow.sum(axis=0)),
+        },
+        'categories': {
+            category: {
+                'inflow': _series(inflow[index]),
+                'outflow': _series(outflow[index]),
+                'net': _series(inflow[index] - outflow[index]),
+            }
+            for index, category in enumerate(categories)
+        }
+    }
+
+
+def _frequency_name(interval_days: float) -> str:
+    for name, low, high in FREQUENCIES:
+        if low <= interval_days <= high:
+            return name
+    return f'every {round(interval_days)} days'
+
+
+def recurring_payments(frame: pd.DataFrame, min_occurrences: int = 3, interval_tolerance: float = 0.2,
+                       amount_tolerance: float = 0.2, min_regular_fraction: float = 0.75) -> List[Dict[str, Any]]:
+    """
+    Find debits to the same merchant at a regular interval for a similar
+    amount. A merchant qualifies when at least `min_regular_fraction` of the
+    gaps between its payments are within `interval_tolerance` of the median
+    gap (or three days, whichever is larger) and as many of its amounts are
+    within `amount_tolerance` of the median amount.
+    """
+    debits = frame[(frame['amount'].values < 0) & (frame['merchant'].values != '')]
+    if debits.empty:
+        return []
+    codes, merchants = pd.factorize(debits['merchant'].values)
+    days = debits['date'].values.astype('datetime64[D]').astype(np.int64)
+    # Order payments by merchant, then date
+    order = np.lexsort((days, codes))
+    codes = codes[order]
+    days = days[order]
+    amounts = -debits['amount'].values[order]
+    categories = debits['category'].values[order]
+    first_of_merchant = np.r_[True, codes[1:] != codes[:-1]]
+    intervals = np.diff(days, prepend=days[0]).astype(np.float64)
+    intervals[first_of_merchant] = np.nan
+
+    # Payments of a merchant are contiguous after sorting
+    starts = np.flatnonzero(first_of_merchant)
+    ends = np.r_[starts[1:], len(codes)]
+    medians = pd.DataFrame({'code': codes, 'interval': intervals, 'amount': amounts}).groupby('code').median()
+    stats = pd.DataFrame({
+        'occurrences': ends - starts,
+        'first_day': days[starts],
+        'last_day': days[ends - 1],
+        'median_interval': medians['interval'].values,
+        'median_amount': medians['amount'].values,
+        'category': categories[ends - 1],
+    })
+
+    # Compare every payment with its merchant's medians
+    median_interval = stats['median_interval'].values[codes]
+    median_amount = stats['median_amount'].values[codes]
+    allowed_gap = np.maximum(interval_tolerance * median_interval, 3)
+    regular_gaps = np.add.reduceat(np.abs(intervals - median_interval) <= allowed_gap, starts)
+    similar_amounts = np.add.reduceat(np.abs(amounts - median_amount) <= amount_tolerance * median_amount, starts)
+    gaps = stats['occurrences'].values - 1
+    stats['regular_fraction'] = np.divide(regular_gaps, gaps, out=np.zeros(len(stats)), where=gaps > 0)
+    stats['similar_fraction'] = similar_amounts / stats['occurrences'].values
+
+    recurring = stats[
+        (stats['occurrences'] >= min_occurrences)
+        & (stats['median_interval'] >= 5)
+        & (stats['regular_fraction'] >= min_regular_fraction)
+        & (stats['similar_fraction'] >= min_regular_fraction)
+    ].copy()
+    if recurring.empty:
+        return []
+    recurring['monthly_cost'] = recurring['median_amount'] * DAYS_PER_MONTH / recurring['median_interval']
+    recurring = recurring.sort_values('monthly_cost', ascending=False)
+
+    epoch = np.datetime64('1970-01-01', 'D')
+    results = []
+    for code, row in zip(recurring.index, recurring.itertuples(index=False)):
+        results.append({
+            'merchant': merchants[code],
+            'category': row.category,
+            'frequency': _frequency_name(row.median_interval),
+            'interval_days': round(float(row.median_interval), 1),
+            'occurrences': int(row.occurrences),
+            'typical_amount': round(float(row.median_amount), 2),
+            'monthly_cost': round(float(row.monthly_cost), 2),
+            'first_date': str(epoch + int(row.first_day)),
+            'last_date': str(epoch + int(row.last_day)),
+            'next_expected_date': str(epoch + int(row.last_day + round(row.median_interval))),
+        })
+    return results
+
+
+def transaction_analytics(queryset: QuerySet, chunk_size: int = 100000) -> Dict[str, Any]:
+    """Recurring payments and monthly cash flow for the transactions in a queryset"""
+    frame = load_transactions(queryset, chunk_size)
+    return {
+        'transaction_count': len(frame),
+        'recurring_payments': recurring_payments(frame),
+        'cash_flow': monthly_cash_flow(frame),
+    }
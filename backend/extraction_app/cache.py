@@ -0,0 +1,72 @@
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+DATA_VERSION_KEY = 'extraction:data_version'
+
+
+def _get_cache():
+    return caches[getattr(settings, 'EXTRACTION_CACHE_ALIAS', 'default')]
+
+
+def get_data_version() -> int:
+    """Return the current data version stamp, initialising it if needed"""
+    cache = _get_cache()
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, 1, timeout=None)
+        version = cache.get(DATA_VERSION_KEY, 1)
+    return version
+
+
+def bump_data_version() -> None:
+    """
+    Invalidate every versioned cache entry by moving the version stamp forward.
+    Called whenever transactions or documents are written.
+    """
+    cache = _get_cache()
+    try:
+        cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        # Key missing or evicted: start a fresh version above the default
+        cache.set(DATA_VERSION_KEY, 2, timeout=None)
+
+
+def normalize_payload(payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drop empty filters and strip strings so equivalent queries share a key"""
+    normalized = {}
+    for key, value in (payload or {}).items():
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            continue
+        normalized[key] = value
+    return normalized
+
+
+def make_cache_key(prefix: str, payload: Optional[Dict[str, Any]] = None, versioned: bool = True) -> str:
+    """Build a cache key from a prefix, the normalized payload and the data version"""
+    encoded = json.dumps(normalize_payload(payload), sort_keys=True, default=str)
+    digest = hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+    version = get_data_version() if versioned else 0
+    return f'extraction:{prefix}:v{version}:{digest}'
+
+
+def cached(prefix: str, compute: Callable[[], Any], payload: Optional[Dict[str, Any]] = None,
+           versioned: bool = True, timeout: Optional[int] = None) -> Any:
+    """
+    Read-through helper: return the cached value for (prefix, payload) or
+    compute, store and return it.
+    """
+    cache = _get_cache()
+    key = make_cache_key(prefix, payload, versioned=versioned)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if timeout is None:
+            timeout = getattr(settings, 'EXTRACTION_CACHE_TIMEOUT', 300)
+        cache.set(key, value, timeout=timeout)
+    return value
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import IO, Optional
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import UploadSession
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class UploadClosed(Exception):
+    """The session was completed, failed or expired while a chunk was written"""
+
+
+class ChunkOffsetMismatch(Exception):
+    """The chunk does not start where the stored data ends"""
+
+    def __init__(self, expected_offset: int):
+        super().__init__(f'Expected chunk at offset {expected_offset}')
+        self.expected_offset = expected_offset
+
+
+# Running SHA-256 per upload session in this process, keyed by session id and
+# holding the offset the digest covers and when it was last used. Sessions
+# resumed in another process rebuild their digest from the partial file.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def part_path(session: UploadSession) -> str:
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.id}.part')
+
+
+def _hasher_for(session: UploadSession, offset: int):
+    with _hashers_lock:
+        entry = _hashers.pop(session.id, None)
+    if entry is not None and entry[0] == offset:
+        return entry[1]
+
+    hasher = hashlib.sha256()
+    path = part_path(session)
+    if offset and os.path.exists(path):
+        with open(path, 'rb') as part_file:
+            remaining = offset
+            while remaining:
+                block = part_file.read(min(STREAM_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def write_chunk(session: UploadSession, offset: int, stream: IO[bytes]) -> int:
+    """
+    Append a chunk read from `stream` at `offset`, hashing it as it is written.
+    The session row stays locked from the offset check until the new offset
+    is saved, so concurrent chunks of one upload are written one at a time.
+    Returns the new number of received bytes.
+    """
+    with db_transaction.atomic():
+        current = UploadSession.objects.select_for_update().get(id=session.id)
+        if current.status != 'open':
+            discard(current)
+            raise UploadClosed(f'Upload is {current.status}')
+        if offset != current.received_bytes:
+            raise ChunkOffsetMismatch(current.received_bytes)
+
+        os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+        path = part_path(session)
+        hasher = _hasher_for(session, offset)
+        written = 0
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as part_file:
+            # Drop any bytes past the offset left by an interrupted chunk
+            part_file.seek(offset)
+            part_file.truncate()
+            while True:
+                block = stream.read(STREAM_BLOCK_SIZE)
+                if not block:
+                    break
+                if offset + written + len(block) > session.total_size:
+                    raise ValueError('Chunk extends past the declared file size')
+                part_file.write(block)
+                hasher.update(block)
+                written += len(block)
+
+        received = offset + written
+        # SQLite ignores the row lock, so only advance if no concurrent request
+        # moved the offset meanwhile; update() skips auto_now, so updated_at is set here
+        updated = UploadSession.objects.filter(id=session.id, received_bytes=offset, status='open').update(
+            received_bytes=received, updated_at=timezone.now()
+        )
+    if not updated:
+        current = UploadSession.objects.get(id=session.id)
+        if current.status != 'open':
+            discard(current)
+            raise UploadClosed(f'Upload is {current.status}')
+        raise ChunkOffsetMismatch(current.received_bytes)
+    session.received_bytes = received
+    now = time.monotonic()
+    with _hashers_lock:
+        _hashers[session.id] = (received, hasher, now)
+        # Drop digests of sessions abandoned in this process
+        for session_id, entry in list(_hashers.items()):
+            if now - entry[2] > settings.CHUNKED_UPLOAD_TTL:
+                del _hashers[session_id]
+    return received
+
+
+def finish_digest(session: UploadSession) -> str:
+    """SHA-256 of the assembled file"""
+    digest = _hasher_for(session, session.received_bytes).hexdigest()
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    return digest
+
+
+def discard(session: UploadSession) -> None:
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    path = part_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def expire_sessions(ttl: Optional[float] = None) -> int:
+    """
+    Mark open sessions that received nothing for `ttl` seconds (default
+    CHUNKED_UPLOAD_TTL) failed and delete their part files, along with part
+    files older than that left by sessions that are no longer open.
+    Returns the number of sessions expired.
+    """
+    ttl = settings.CHUNKED_UPLOAD_TTL if ttl is None else ttl
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    expired = 0
+    for session in list(UploadSession.objects.filter(status='open', updated_at__lt=cutoff).only('id')):
+        # A chunk may have arrived since the query; only expire still-idle sessions
+        if UploadSession.objects.filter(id=session.id, status='open', updated_at__lt=cutoff).update(
+            status='failed', updated_at=timezone.now()
+        ):
+            discard(session)
+            expired += 1
+
+    if os.path.isdir(settings.CHUNKED_UPLOAD_DIR):
+        open_ids = {str(session_id) for session_id in UploadSession.objects.filter(status='open').values_list('id', flat=True)}
+        for entry in os.scandir(settings.CHUNKED_UPLOAD_DIR):
+            if (entry.name.endswith('.part') and entry.name[:-len('.part')] not in open_ids
+                    and entry.stat().st_mtime < cutoff.timestamp()):
+                os.remove(entry.path)
+    return expired
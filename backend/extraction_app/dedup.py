@@ -0,0 +1,119 @@
+import hashlib
+import re
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import Transaction
+
+LOOKUP_BATCH_SIZE = 500
+
+
+def account_key(bank_type: str, account_type: str, account_number: str = '') -> str:
+    """Identify the account a statement belongs to"""
+    return ':'.join([bank_type or 'unknown', account_type or 'unknown', account_number or ''])
+
+
+def normalize_description(description: str) -> str:
+    """Uppercase and strip punctuation/whitespace differences between statements"""
+    return re.sub(r'[^A-Z0-9]+', ' ', (description or '').upper()).strip()
+
+
+def normalize_amount(amount: Any) -> str:
+    # Adding zero turns the -0.00 of a parsed zero debit into the 0.00 stored for it
+    return str(Decimal(str(amount)).quantize(Decimal('0.01')) + 0)
+
+
+def transaction_fingerprint(account: str, date: str, amount: Any, description: str, occurrence: int = 0) -> str:
+    """
+    Stable fingerprint of a transaction. `occurrence` separates genuinely repeated
+    transactions (same day, amount and payee) within one statement.
+    """
+    key = '|'.join([account, str(date), normalize_amount(amount), normalize_description(description), str(occurrence)])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def fingerprint_transactions(account: str, transactions: Iterable[Dict[str, Any]],
+                             seen: Optional[Dict[Tuple[str, str, str], int]] = None) -> List[str]:
+    """
+    Fingerprint parsed transactions, numbering repeats within the batch. Pass
+    the same `seen` dict for consecutive batches of one statement so repeats
+    split across batches are numbered as if the batches were one.
+    """
+    seen = {} if seen is None else seen
+    fingerprints = []
+    for transaction in transactions:
+        base = (
+            str(transaction['date']),
+            normalize_amount(transaction['amount']),
+            normalize_description(transaction['description'])
+        )
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        fingerprints.append(transaction_fingerprint(
+            account, transaction['date'], transaction['amount'], transaction['description'], occurrence
+        ))
+    return fingerprints
+
+
+def _stored(fingerprints: List[str], **filters) -> Set[str]:
+    stored = set()
+    for start in range(0, len(fingerprints), LOOKUP_BATCH_SIZE):
+        batch = fingerprints[start:start + LOOKUP_BATCH_SIZE]
+        stored.update(
+            Transaction.objects.filter(fingerprint__in=batch, **filters).values_list('fingerprint', flat=True)
+        )
+    return stored
+
+
+def existing_fingerprints(fingerprints: List[str], fallback: Optional[List[str]] = None) -> Set[str]:
+    """
+    Look up which fingerprints are already stored, in index-backed batches.
+    `fallback` holds the same transactions fingerprinted without the account
+    number: a fingerprint also counts as stored when its fallback belongs to a
+    statement stored without an account number, such as one imported without
+    it or uploaded before account numbers were read.
+    """
+    existing = _stored(fingerprints)
+    if fallback:
+        unnumbered = _stored(fallback, document__account_number='')
+        existing.update(
+            fingerprint for fingerprint, coarse in zip(fingerprints, fallback) if coarse in unnumbered
+        )
+    return existing
+
+
+def count_stored(fingerprints: List[str], document_ids: Iterable[int]) -> int:
+    """
+    Count the fingerprints stored under the given documents, in index-backed
+    batches: the rows a bulk_create with ignore_conflicts actually inserted
+    """
+    document_ids = list(document_ids)
+    count = 0
+    for start in range(0, len(fingerprints), LOOKUP_BATCH_SIZE):
+        count += Transaction.objects.filter(
+            fingerprint__in=fingerprints[start:start + LOOKUP_BATCH_SIZE], document_id__in=document_ids
+        ).count()
+    return count
+
+
+def fallback_account_key(bank_type: str, account_type: str, account_number: str) -> Optional[str]:
+    """The key without the account number to also deduplicate against, when there is one"""
+    return account_key(bank_type, account_type) if account_number else None
+
+
+def filter_new_transactions(account: str, transactions: List[Dict[str, Any]],
+                            fallback_account: Optional[str] = None) -> Tuple[List[Tuple[str, Dict[str, Any]]], int]:
+    """
+    Return (fingerprint, transaction) pairs not yet stored for this account,
+    plus the number of duplicates skipped. Rows stored without an account
+    number are matched under `fallback_account` (see fallback_account_key).
+    """
+    fingerprints = fingerprint_transactions(account, transactions)
+    fallback = fingerprint_transactions(fallback_account, transactions) if fallback_account else None
+    existing = existing_fingerprints(fingerprints, fallback)
+    new_transactions = [
+        (fingerprint, transaction)
+        for fingerprint, transaction in zip(fingerprints, transactions)
+        if fingerprint not in existing
+    ]
+    return new_transactions, len(transactions) - len(new_transactions)
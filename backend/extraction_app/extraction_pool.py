@@ -0,0 +1,236 @@
+import atexit
+import cProfile
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import List, Optional
+
+from django.conf import settings
+
+from .profiling import add_worker_stats, worker_profiling_requested
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionError(Exception):
+    """PDF extraction failed in an isolated worker"""
+    status = 'failed'
+
+
+class ExtractionTimeout(ExtractionError):
+    status = 'timed_out'
+
+
+class ExtractionMemoryExceeded(ExtractionError):
+    status = 'memory_exceeded'
+
+
+def _worker_main(connection, page_budget: Optional[float]) -> None:
+    """
+    Worker process loop: extract the pages of each path sent until told to
+    stop. Documents sent with profile=True are run under cProfile and the raw
+    stats are sent back with the result.
+    """
+    from .ml_services.pdf_extractor import PDFExtractor, import_pdf_libraries
+
+    # Import the PDF libraries before the first document arrives
+    import_pdf_libraries()
+    extractor = PDFExtractor()
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        path, profile = request
+        profiler = cProfile.Profile() if profile else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            pages = extractor.extract_pages(path, page_budget=page_budget)
+            if extractor.skipped_pages:
+                logger.warning("Skipped %d page(s) over the %ss budget in %s", extractor.skipped_pages, page_budget, path)
+            outcome, payload = 'ok', pages
+        except MemoryError:
+            outcome, payload = 'memory', 'Out of memory while extracting'
+        except Exception as e:
+            outcome, payload = 'error', str(e)
+        stats = None
+        if profiler is not None:
+            profiler.disable()
+            profiler.create_stats()
+            stats = profiler.stats
+        connection.send((outcome, payload, stats))
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process, or None where /proc is unavailable"""
+    try:
+        with open(f'/proc/{pid}/status') as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class _Worker:
+    def __init__(self, context, page_budget: Optional[float]):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_connection, page_budget), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.documents = 0
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.connection.send(None)
+            except (OSError, ValueError):
+                self.process.kill()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class ExtractionPool:
+    """
+    Supervised pool of extraction processes. Each document gets a wall-clock
+    timeout and an RSS cap; a worker that breaches either is killed and
+    replaced, and workers are recycled after a fixed number of documents to
+    contain pdfminer's memory growth.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 120, max_rss_mb: Optional[int] = 1024,
+                 page_budget: Optional[float] = 15, max_documents_per_worker: int = 25,
+                 poll_interval: float = 0.1):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.page_budget = page_budget
+        self.max_documents_per_worker = max_documents_per_worker
+        self.poll_interval = poll_interval
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._context = multiprocessing.get_context(start_method)
+        if start_method == 'forkserver':
+            # Import the PDF libraries once in the fork server so new workers start warm
+            self._context.set_forkserver_preload(['pdfplumber', 'PyPDF2'])
+        self.pid = os.getpid()
+        self._idle = []
+        self._started = 0
+        self._condition = threading.Condition()
+
+    def _acquire(self) -> _Worker:
+        with self._condition:
+            while not self._idle and self._started >= self.workers:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            return _Worker(self._context, self.page_budget)
+        except Exception:
+            self._release(None)
+            raise
+
+    def _release(self, worker: Optional[_Worker]) -> None:
+        with self._condition:
+            if worker is not None:
+                self._idle.append(worker)
+            else:
+                self._started -= 1
+            self._condition.notify()
+
+    def prestart(self) -> None:
+        """Start every worker now rather than on first use"""
+        with self._condition:
+            missing = max(0, self.workers - self._started)
+            self._started += missing
+        for _ in range(missing):
+            try:
+                worker = _Worker(self._context, self.page_budget)
+            except Exception:
+                self._release(None)
+                raise
+            self._release(worker)
+
+    def extract_pages(self, path: str) -> List[str]:
+        """Extract a PDF's page text in a worker, enforcing the time and memory limits"""
+        worker = self._acquire()
+        responded = reusable = False
+        try:
+            try:
+                worker.connection.send((os.path.abspath(path), worker_profiling_requested()))
+            except (OSError, ValueError) as e:
+                raise ExtractionError(f'Extraction worker unavailable: {e}')
+            deadline = time.monotonic() + self.timeout
+            while not worker.connection.poll(self.poll_interval):
+                if not worker.process.is_alive():
+                    raise ExtractionError(f'Extraction worker exited with code {worker.process.exitcode}')
+                if time.monotonic() > deadline:
+                    raise ExtractionTimeout(f'Extraction exceeded {self.timeout}s')
+                rss = _rss_bytes(worker.process.pid)
+                if self.max_rss_bytes and rss and rss > self.max_rss_bytes:
+                    raise ExtractionMemoryExceeded(
+                        f'Extraction exceeded {self.max_rss_bytes // (1024 * 1024)} MB of memory'
+                    )
+            try:
+                outcome, payload, stats = worker.connection.recv()
+            except (EOFError, OSError):
+                raise ExtractionError(f'Extraction worker exited with code {worker.process.exitcode}')
+            responded = True
+            if stats is not None:
+                add_worker_stats(stats)
+            worker.documents += 1
+            reusable = outcome != 'memory' and worker.documents < self.max_documents_per_worker
+            if outcome == 'memory':
+                raise ExtractionMemoryExceeded(payload)
+            if outcome == 'error':
+                raise ExtractionError(payload)
+            return payload
+        finally:
+            if reusable:
+                self._release(worker)
+            else:
+                # Kill runaway workers outright; let recycled ones exit cleanly
+                worker.stop(kill=not responded)
+                self._release(None)
+
+    def shutdown(self) -> None:
+        if os.getpid() != self.pid:
+            # Forked children must not stop the parent's workers
+            return
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+        for worker in idle:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """Process-wide extraction pool configured from settings"""
+    global _pool
+    with _pool_lock:
+        # A pool inherited through fork belongs to the parent process
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ExtractionPool(
+                workers=settings.EXTRACTION_WORKERS,
+                timeout=settings.EXTRACTION_TIMEOUT,
+                max_rss_mb=settings.EXTRACTION_MAX_RSS_MB,
+                page_budget=settings.EXTRACTION_PAGE_BUDGET,
+                max_documents_per_worker=settings.EXTRACTION_MAX_DOCUMENTS_PER_WORKER
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
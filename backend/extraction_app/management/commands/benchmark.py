@@ -0,0 +1,164 @@
+import gzip
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from rest_framework.renderers import JSONRenderer
+
+from extraction_app.models import PDFDocument, Transaction
+from extraction_app.partitioning import ensure_month_partitions
+from extraction_app.renderers import ORJSONRenderer
+from extraction_app.serializers import TransactionSerializer, serialize_transaction_rows
+from extraction_app.ml_services.category_classifier import CategoryClassifier
+from extraction_app.ml_services.hashed_classifier import HashedNgramClassifier, load_model
+from extraction_app.ml_services.merchant_normalizer import MerchantCache
+
+SAMPLE_MERCHANTS = [
+    ('UPI-SWIGGY-swiggy@icici-{ref}-PAYMENT', 'food'),
+    ('POS {ref} AMAZON RETAIL IN', 'shopping'),
+    ('UBER TRIP {ref}', 'transport'),
+    ('NETFLIX SUBSCRIPTION {ref}', 'entertainment'),
+    ('BSNL BILL PAYMENT {ref}', 'bills'),
+    ('NEFT CR-{ref}-SALARY ACME LTD', 'income'),
+    ('IMPS-{ref}-TRANSFER TO SAVINGS', 'transfer'),
+    ('APOLLO PHARMACY {ref}', 'healthcare'),
+    ('GAS AGENCY SUPPLY {ref}', 'business'),
+    ('ATM WDL {ref}', 'other'),
+]
+
+
+# Run in a fresh interpreter: boot the WSGI application the way a server
+# worker does, then time the first and second statement through the pipeline
+STARTUP_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+from importlib import import_module
+from django.conf import settings
+settings.PIPELINE_WARMUP = {warmup}
+import_module(settings.WSGI_APPLICATION.rsplit('.', 1)[0])
+import_module(settings.ROOT_URLCONF)
+boot = time.perf_counter() - start
+from extraction_app.pipeline import extract_statement_pages, analyze_pages
+timings = []
+for _ in range(2):
+    start = time.perf_counter()
+    pages = extract_statement_pages({pdf!r})
+    analyze_pages(pages, settings.CATEGORY_MODEL_PATH, settings.CATEGORY_MODEL_MIN_CONFIDENCE)
+    timings.append(time.perf_counter() - start)
+print(json.dumps({{'boot': boot, 'first': timings[0], 'second': timings[1]}}))
+'''
+
+
+def _synthetic_transactions(count, seed=0):
+    rng = random.Random(seed)
+    transactions = []
+    for _ in range(count):
+        template, category = rng.choice(SAMPLE_MERCHANTS)
+        amount = round(rng.uniform(10, 5000), 2)
+        transactions.append({
+            'description': template.format(ref=rng.randrange(10 ** 9, 10 ** 12)),
+            'amount': amount if category == 'income' else -amount,
+            'type': 'credit' if category == 'income' else 'debit',
+            'category': category
+        })
+    return transactions
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmarks for the extraction pipeline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', choices=['classifier', 'serializer', 'startup'])
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--pdf', default=os.path.join(settings.BASE_DIR.parent, 'data', 'sample_pdfs', 'hdfc-demo.pdf'),
+                            help='Statement processed by the startup benchmark')
+
+    def handle(self, *args, **options):
+        if options['target'] == 'startup':
+            self.benchmark_startup(options['pdf'])
+        else:
+            getattr(self, f'benchmark_{options["target"]}')(options['rows'])
+
+    def _report(self, label, rows, elapsed):
+        self.stdout.write(f'{label:<32} {rows:>9} rows  {elapsed:8.3f}s  {rows / elapsed:>12,.0f} rows/sec')
+
+    def benchmark_classifier(self, rows):
+        transactions = _synthetic_transactions(rows)
+        descriptions = [t['description'] for t in transactions]
+
+        model = load_model(settings.CATEGORY_MODEL_PATH)
+        if model is None:
+            self.stdout.write('No trained model found; training one on synthetic data')
+            model = HashedNgramClassifier([category for category, _ in Transaction.CATEGORY_CHOICES])
+            training = _synthetic_transactions(5000, seed=1)
+            model.fit([t['description'] for t in training], [t['category'] for t in training])
+
+        model.predict(descriptions[:1000])
+        start = time.perf_counter()
+        model.predict(descriptions)
+        self._report('hashed model (batched)', rows, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        CategoryClassifier(cache=MerchantCache(), model=None).classify_transactions(transactions)
+        self._report('pattern rules + merchant memo', rows, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        CategoryClassifier(cache=MerchantCache(), model=model).classify_transactions(transactions)
+        self._report('model with rule fallback', rows, time.perf_counter() - start)
+
+    def benchmark_serializer(self, rows):
+        # Work on throwaway rows inside a transaction that is rolled back
+        with db_transaction.atomic():
+            document = PDFDocument.objects.create(filename='benchmark.pdf', file_size=0, processed=True)
+            transaction_rows = [
+                Transaction(
+                    document=document,
+                    date=date(2024, 1, 1) + timedelta(days=t % 365),
+                    description=t_data['description'],
+                    amount=t_data['amount'],
+                    category=t_data['category'],
+                    transaction_type=t_data['type']
+                )
+                for t, t_data in enumerate(_synthetic_transactions(rows))
+            ]
+            ensure_month_partitions(row.date for row in transaction_rows)
+            Transaction.objects.bulk_create(transaction_rows, batch_size=1000)
+            queryset = Transaction.objects.filter(document=document)
+
+            start = time.perf_counter()
+            baseline = JSONRenderer().render(TransactionSerializer(queryset, many=True).data)
+            self._report('ModelSerializer + JSONRenderer', rows, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            body = ORJSONRenderer().render(serialize_transaction_rows(queryset))
+            self._report('values_list rows + orjson', rows, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            compressed = gzip.compress(body, compresslevel=settings.RESPONSE_COMPRESSION_GZIP_LEVEL, mtime=0)
+            self._report('gzip compression', rows, time.perf_counter() - start)
+            self.stdout.write(
+                f'Body size: {len(baseline):,} bytes (JSONRenderer), {len(body):,} bytes (orjson), '
+                f'{len(compressed):,} bytes gzipped'
+            )
+            db_transaction.set_rollback(True)
+
+    def benchmark_startup(self, pdf):
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)}
+        for warmup in (False, True):
+            script = STARTUP_SCRIPT.format(warmup=warmup, pdf=os.path.abspath(pdf))
+            output = subprocess.run(
+                [sys.executable, '-c', script], env=env, cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout
+            timings = json.loads(output.strip().splitlines()[-1])
+            self.stdout.write(
+                f'{"warm-up" if warmup else "no warm-up":<12} boot {timings["boot"]:7.3f}s  '
+                f'first statement {timings["first"]:7.3f}s  second statement {timings["second"]:7.3f}s'
+            )
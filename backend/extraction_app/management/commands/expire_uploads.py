@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from extraction_app.chunked_upload import expire_sessions
+
+
+class Command(BaseCommand):
+    help = 'Fail chunked uploads that stopped receiving chunks and delete their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=float, default=settings.CHUNKED_UPLOAD_TTL,
+                            help='Seconds an open upload may go without a chunk (default: CHUNKED_UPLOAD_TTL)')
+
+    def handle(self, *args, **options):
+        expired = expire_sessions(options['ttl'])
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} upload(s)'))
@@ -0,0 +1,149 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from extraction_app.extraction_pool import ExtractionPool
+from extraction_app.pipeline import analyze_pages, store_statement
+
+CHECKPOINT_FILENAME = '.ingest_checkpoint.json'
+
+
+def _find_pdfs(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith('.pdf'):
+                yield os.path.join(root, name)
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+
+def _process(pool, path):
+    """Extract in a supervised worker, then parse and classify in this thread"""
+    pages = pool.extract_pages(path)
+    return analyze_pages(pages, settings.CATEGORY_MODEL_PATH, settings.CATEGORY_MODEL_MIN_CONFIDENCE)
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk ingest every PDF statement under a directory. Extraction runs in supervised worker '
+        'processes with the EXTRACTION_* timeout, memory cap and page budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of extraction processes')
+        parser.add_argument('--checkpoint',
+                            help=f'Progress file (default: <directory>/{CHECKPOINT_FILENAME})')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint and ingest every file again')
+
+    def handle(self, *args, **options):
+        directory = os.path.abspath(options['directory'])
+        if not os.path.isdir(directory):
+            raise CommandError(f'{directory} is not a directory')
+
+        checkpoint_path = options['checkpoint'] or os.path.join(directory, CHECKPOINT_FILENAME)
+        checkpoint = {} if options['restart'] else self._load_checkpoint(checkpoint_path)
+
+        pending = []
+        for path in _find_pdfs(directory):
+            relative_path = os.path.relpath(path, directory)
+            done = checkpoint.get(relative_path)
+            if done and {'size': done['size'], 'mtime': done['mtime']} == _file_signature(path):
+                continue
+            pending.append(path)
+
+        self.stdout.write(f'{len(pending)} file(s) to ingest, {len(checkpoint)} already done')
+        if not pending:
+            return
+
+        files = pages = rows = duplicates = failures = 0
+        start = time.perf_counter()
+        workers = max(1, options['workers'])
+
+        # A worker that times out, exceeds the memory cap or crashes is
+        # replaced by the pool, so one bad PDF only fails its own file
+        pool = ExtractionPool(
+            workers=workers,
+            timeout=settings.EXTRACTION_TIMEOUT,
+            max_rss_mb=settings.EXTRACTION_MAX_RSS_MB,
+            page_budget=settings.EXTRACTION_PAGE_BUDGET,
+            max_documents_per_worker=settings.EXTRACTION_MAX_DOCUMENTS_PER_WORKER
+        )
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            queue = iter(pending)
+            in_flight = {}
+
+            def submit_next():
+                path = next(queue, None)
+                if path is not None:
+                    in_flight[executor.submit(_process, pool, path)] = path
+
+            # Keep the pool busy without holding every parsed file in memory
+            for _ in range(workers * 2):
+                submit_next()
+
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = in_flight.pop(future)
+                    relative_path = os.path.relpath(path, directory)
+                    try:
+                        submit_next()
+                        result = future.result()
+                        document, created, skipped = store_statement(
+                            os.path.basename(path), os.path.getsize(path), result
+                        )
+                    except Exception as e:
+                        failures += 1
+                        self.stderr.write(f'FAILED {relative_path}: {e}')
+                        continue
+
+                    files += 1
+                    pages += result['page_count']
+                    rows += created
+                    duplicates += skipped
+                    checkpoint[relative_path] = {
+                        **_file_signature(path),
+                        'document_id': document.id,
+                        'transactions': created
+                    }
+                    self._save_checkpoint(checkpoint_path, checkpoint)
+                    self.stdout.write(
+                        f'{relative_path}: {result["page_count"]} pages, {created} new, {skipped} duplicate'
+                    )
+        finally:
+            executor.shutdown(cancel_futures=True)
+            pool.shutdown()
+
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ingested {files} file(s), {pages} pages, {rows} transactions '
+            f'({duplicates} duplicates skipped, {failures} failed) in {elapsed:.1f}s'
+        ))
+        self.stdout.write(
+            f'Throughput: {files / elapsed:.2f} files/sec, {pages / elapsed:.2f} pages/sec, '
+            f'{rows / elapsed:.1f} rows/sec'
+        )
+
+    def _load_checkpoint(self, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as checkpoint_file:
+            return json.load(checkpoint_file)
+
+    def _save_checkpoint(self, path, checkpoint):
+        # Write then rename so an interrupted run never leaves a torn file
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file, indent=2)
+        os.replace(temporary_path, path)
@@ -0,0 +1,61 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from extraction_app.cache import bump_data_version
+from extraction_app import partitioning
+
+
+def _parse_month(value):
+    try:
+        year, month = value.split('-')
+        return int(year), int(month)
+    except ValueError:
+        raise CommandError(f'Expected a month as YYYY-MM, got {value!r}')
+
+
+class Command(BaseCommand):
+    help = 'Partition the transaction table by month on PostgreSQL, create upcoming partitions and archive old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help='Rebuild the transaction table as a partitioned table, copying all rows')
+        parser.add_argument('--ahead', type=int, default=3,
+                            help='Months past the current one to create partitions for')
+        parser.add_argument('--archive-before', metavar='YYYY-MM',
+                            help='Detach partitions older than this month into the archive schema')
+
+    def handle(self, *args, **options):
+        if not partitioning.supported():
+            raise CommandError('Table partitioning requires PostgreSQL; SQLite keeps the plain transaction table')
+
+        if options['convert']:
+            months = partitioning.convert_to_partitioned(ahead=options['ahead'])
+            if months:
+                self.stdout.write(self.style.SUCCESS(f'Converted the transaction table into {len(months)} monthly partitions'))
+            else:
+                self.stdout.write('The transaction table is already partitioned')
+        elif not partitioning.is_partitioned():
+            raise CommandError('The transaction table is not partitioned; run with --convert first')
+        else:
+            month = partitioning.month_of(date.today())
+            upcoming = [month]
+            for _ in range(options['ahead']):
+                month = partitioning.next_month(month)
+                upcoming.append(month)
+            created = partitioning.ensure_month_partitions(date(year, number, 1) for year, number in upcoming)
+            self.stdout.write(f'Created {len(created)} upcoming partition(s)')
+
+        if options['archive_before']:
+            archived = partitioning.archive_partitions_before(_parse_month(options['archive_before']))
+            for name in archived:
+                self.stdout.write(f'archived {name}')
+            if archived:
+                # Archived rows no longer show up in search results
+                bump_data_version()
+            self.stdout.write(self.style.SUCCESS(f'Archived {len(archived)} partition(s)'))
+
+        months = sorted(partitioning.existing_partitions())
+        if months:
+            self.stdout.write(f'Partitions: {len(months)} from {months[0][0]}-{months[0][1]:02d} '
+                              f'to {months[-1][0]}-{months[-1][1]:02d}')
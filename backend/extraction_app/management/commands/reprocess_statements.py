@@ -0,0 +1,37 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from extraction_app.models import PDFDocument
+from extraction_app.reprocess import stale_documents, reprocess_documents
+
+
+class Command(BaseCommand):
+    help = 'Re-parse and reclassify stored statements whose parser or classifier version is out of date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('document_ids', nargs='*', type=int,
+                            help='Only reprocess these documents (default: every stale document)')
+        parser.add_argument('--all', action='store_true',
+                            help='Reprocess every document with stored page text, stale or not')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            documents = PDFDocument.objects.filter(page_text__isnull=False)
+        else:
+            documents = stale_documents()
+        if options['document_ids']:
+            documents = documents.filter(id__in=options['document_ids'])
+
+        start = time.perf_counter()
+        reports = reprocess_documents(documents.order_by('id').iterator(), workers=options['workers'])
+        elapsed = time.perf_counter() - start
+
+        for report in reports:
+            self.stdout.write(
+                f"document {report['document_id']}: {report['created']} created, {report['updated']} updated, "
+                f"{report['deleted']} deleted, {report['unchanged']} unchanged"
+            )
+        self.stdout.write(self.style.SUCCESS(f'Reprocessed {len(reports)} document(s) in {elapsed:.1f}s'))
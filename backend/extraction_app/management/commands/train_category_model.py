@@ -0,0 +1,55 @@
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from extraction_app.models import Transaction
+from extraction_app.ml_services.hashed_classifier import HashedNgramClassifier
+
+
+class Command(BaseCommand):
+    help = 'Train the hashed n-gram category model from stored transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.CATEGORY_MODEL_PATH,
+                            help='Path of the .npy weights file to write')
+        parser.add_argument('--epochs', type=int, default=30)
+        parser.add_argument('--max-samples', type=int, default=200000,
+                            help='Maximum number of distinct descriptions to train on')
+        parser.add_argument('--min-confidence', type=float, default=0.0,
+                            help='Only learn from rows classified at least this confidently')
+        parser.add_argument('--holdout', type=float, default=0.1,
+                            help='Fraction of samples held out to report accuracy')
+
+    def handle(self, *args, **options):
+        if not options['output'].endswith('.npy'):
+            raise CommandError(f'--output must end in .npy: {options["output"]}')
+
+        samples = {}
+        rows = Transaction.objects.filter(
+            confidence_score__gte=options['min_confidence']
+        ).values_list('description', 'category').iterator(chunk_size=5000)
+        for description, category in rows:
+            samples.setdefault(description, category)
+            if len(samples) >= options['max_samples']:
+                break
+
+        if not samples:
+            raise CommandError('No stored transactions to train on')
+
+        pairs = list(samples.items())
+        random.Random(0).shuffle(pairs)
+        holdout_size = int(len(pairs) * options['holdout'])
+        train, test = pairs[holdout_size:], pairs[:holdout_size]
+
+        classes = [category for category, _ in Transaction.CATEGORY_CHOICES]
+        model = HashedNgramClassifier(classes)
+        model.fit([d for d, _ in train], [c for _, c in train], epochs=options['epochs'])
+        model.save(options['output'])
+
+        self.stdout.write(f'Trained on {len(train)} descriptions')
+        if test:
+            predictions = model.predict([d for d, _ in test])
+            correct = sum(1 for (category, _), (_, label) in zip(predictions, test) if category == label)
+            self.stdout.write(f'Holdout accuracy: {correct / len(test):.3f} ({len(test)} descriptions)')
+        self.stdout.write(self.style.SUCCESS(f'Model written to {options["output"]}'))
@@ -0,0 +1,123 @@
+import gzip
+import os
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from extraction_app.cache import bump_data_version
+from extraction_app.models import Transaction
+from extraction_app.pipeline import get_classifier
+from extraction_app.transaction_io import (
+    TransactionImporter, export_records, iter_json_records, iter_ndjson_records, write_records
+)
+
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+# Rejected records reported individually before only counting the rest
+MAX_REPORTED_INVALID = 20
+
+
+def _is_ndjson(path, fmt):
+    if fmt != 'auto':
+        return fmt == 'ndjson'
+    name = path[:-3] if path.endswith('.gz') else path
+    return name.lower().endswith(NDJSON_SUFFIXES)
+
+
+def _open(path, mode):
+    """Open a path for streaming, gunzipping .gz files; '-' is stdin or stdout"""
+    if path == '-':
+        if 'r' in mode:
+            return open(sys.stdin.fileno(), 'r', encoding='utf-8', closefd=False)
+        return open(sys.stdout.fileno(), 'wb', closefd=False)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't' if 'r' in mode else mode + 'b', encoding='utf-8' if 'r' in mode else None)
+    if 'r' in mode:
+        return open(path, 'r', encoding='utf-8')
+    return open(path, 'wb')
+
+
+class Command(BaseCommand):
+    help = 'Stream transactions in or out as JSON or NDJSON, classifying imported rows without a category'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['import', 'export'])
+        parser.add_argument('path', help="JSON or NDJSON file, optionally .gz; '-' for stdin/stdout")
+        parser.add_argument('--format', choices=['auto', 'json', 'ndjson'], default='auto',
+                            help='Default: NDJSON for .ndjson/.jsonl files, otherwise JSON')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Records validated, classified and inserted per transaction')
+        parser.add_argument('--source',
+                            help='Document name for imported records without a "source" (default: the file name)')
+        parser.add_argument('--bank-type', help='Import: default bank type. Export: only this bank type')
+        parser.add_argument('--account-type', default='unknown', help='Import: default account type')
+        parser.add_argument('--account-number', default='', help='Import: default account number')
+        parser.add_argument('--date-from', help='Export: only transactions on or after this date')
+        parser.add_argument('--date-to', help='Export: only transactions on or before this date')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path != '-' and options['action'] == 'import' and not os.path.isfile(path):
+            raise CommandError(f'{path} is not a file')
+        ndjson = _is_ndjson(path, options['format'])
+        if options['action'] == 'import':
+            self.import_transactions(path, ndjson, options)
+        else:
+            self.export_transactions(path, ndjson, options)
+
+    def import_transactions(self, path, ndjson, options):
+        importer = TransactionImporter(
+            get_classifier(settings.CATEGORY_MODEL_PATH, settings.CATEGORY_MODEL_MIN_CONFIDENCE),
+            defaults={
+                'source': options['source'] or os.path.basename(path if path != '-' else 'stdin'),
+                'bank_type': options['bank_type'] or 'unknown',
+                'account_type': options['account_type'],
+                'account_number': options['account_number'],
+            },
+            batch_size=max(1, options['batch_size'])
+        )
+
+        def on_invalid(number, error):
+            if importer.stats['invalid'] <= MAX_REPORTED_INVALID:
+                self.stderr.write(f'record {number}: {error}')
+
+        def on_batch(stats):
+            self.stdout.write(f'{stats["read"]} read, {stats["created"]} new, {stats["duplicates"]} duplicate')
+
+        start = time.perf_counter()
+        try:
+            with _open(path, 'r') as stream:
+                records = iter_ndjson_records(stream) if ndjson else iter_json_records(stream)
+                stats = importer.run(records, on_invalid=on_invalid, on_batch=on_batch)
+        except ValueError as e:
+            raise CommandError(f'Invalid input after {importer.stats["read"]} record(s): {e}')
+        finally:
+            # Batches already committed stay, so searches must see them even on failure
+            if importer.stats['created']:
+                bump_data_version()
+
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {stats["created"]} transaction(s) into {stats["documents"]} document(s) '
+            f'({stats["duplicates"]} duplicates skipped, {stats["invalid"]} invalid, '
+            f'{stats["classified"]} classified) in {elapsed:.1f}s'
+        ))
+        self.stdout.write(f'Throughput: {stats["read"] / elapsed:.0f} records/sec')
+
+    def export_transactions(self, path, ndjson, options):
+        transactions = Transaction.objects.all()
+        if options['date_from']:
+            transactions = transactions.filter(date__gte=options['date_from'])
+        if options['date_to']:
+            transactions = transactions.filter(date__lte=options['date_to'])
+        if options['bank_type']:
+            transactions = transactions.filter(document__bank_type=options['bank_type'])
+
+        start = time.perf_counter()
+        with _open(path, 'w') as stream:
+            count = write_records(export_records(transactions), stream, ndjson=ndjson)
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        # Progress goes to stderr when the records themselves go to stdout
+        output = self.stderr if path == '-' else self.stdout
+        output.write(f'Exported {count} transaction(s) in {elapsed:.1f}s ({count / elapsed:.0f} records/sec)')
@@ -0,0 +1,92 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+def _accepted_encodings(header: str) -> dict:
+    """Parse an Accept-Encoding header into {encoding: q-value}"""
+    encodings = {}
+    for part in header.split(','):
+        name, *params = part.split(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def _choose_encoding(header: str, available: list) -> str:
+    """
+    The available encoding with the highest q-value in an Accept-Encoding
+    header, preferring the earlier one on a tie. Returns 'identity' when
+    nothing is acceptable or an uncompressed response is preferred.
+    """
+    accepted = _accepted_encodings(header)
+    default = accepted.get('*', 0.0)
+    best, best_quality = 'identity', 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    # An unlisted identity stays acceptable but is never preferred
+    if accepted.get('identity', default) > best_quality:
+        return 'identity'
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress large API responses with brotli or gzip, whichever the client
+    prefers and the server supports.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        min_size = getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+        if response.streaming or response.has_header('Content-Encoding') or len(response.content) < min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = _choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), ['br', 'gzip'] if brotli is not None else ['gzip']
+        )
+        if encoding == 'br':
+            compressed = brotli.compress(
+                response.content, quality=getattr(settings, 'RESPONSE_COMPRESSION_BROTLI_QUALITY', 4)
+            )
+        elif encoding == 'gzip':
+            compressed = gzip.compress(
+                response.content, compresslevel=getattr(settings, 'RESPONSE_COMPRESSION_GZIP_LEVEL', 6), mtime=0
+            )
+        else:
+            return response
+
+        # Compressing is only worthwhile if it saves space
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
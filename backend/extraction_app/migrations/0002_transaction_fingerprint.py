@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:33
+
+import hashlib
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# Frozen copy of the fingerprint logic in extraction_app.dedup as of this
+# migration, so later changes there cannot change what the backfill does
+def account_key(bank_type, account_type):
+    return ':'.join([bank_type or 'unknown', account_type or 'unknown', ''])
+
+
+def fingerprint_transactions(account, transactions):
+    seen = {}
+    fingerprints = []
+    for transaction in transactions:
+        description = re.sub(r'[^A-Z0-9]+', ' ', (transaction['description'] or '').upper()).strip()
+        amount = str(Decimal(str(transaction['amount'])).quantize(Decimal('0.01')))
+        base = (str(transaction['date']), amount, description)
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        key = '|'.join([account, *base, str(occurrence)])
+        fingerprints.append(hashlib.sha256(key.encode('utf-8')).hexdigest())
+    return fingerprints
+
+
+def backfill_fingerprints(apps, schema_editor):
+    PDFDocument = apps.get_model('extraction_app', 'PDFDocument')
+    Transaction = apps.get_model('extraction_app', 'Transaction')
+
+    seen = set()
+    for document in PDFDocument.objects.order_by('id').iterator():
+        rows = list(Transaction.objects.filter(document=document).order_by('id'))
+        if not rows:
+            continue
+        account = account_key(document.bank_type, document.account_type)
+        fingerprints = fingerprint_transactions(account, [
+            {'date': row.date.isoformat(), 'amount': row.amount, 'description': row.description}
+            for row in rows
+        ])
+        updated = []
+        for row, fingerprint in zip(rows, fingerprints):
+            # Rows already stored by an earlier overlapping statement keep a null fingerprint
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            row.fingerprint = fingerprint
+            updated.append(row)
+        Transaction.objects.bulk_update(updated, ['fingerprint'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
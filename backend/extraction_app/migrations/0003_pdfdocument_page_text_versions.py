@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction_app', '0002_transaction_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='classifier_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='page_text',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='parser_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction_app', '0003_pdfdocument_page_text_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='error_message',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('failed', 'Failed'), ('timed_out', 'Timed out'), ('memory_exceeded', 'Memory limit exceeded')], default='processed', max_length=20),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:51
+
+import re
+
+from django.db import migrations, models
+
+VPA_PATTERN = re.compile(r'[A-Z0-9._]+@[A-Z0-9]+')
+SEPARATOR_PATTERN = re.compile(r'[^A-Z0-9]+')
+DIGIT_PATTERN = re.compile(r'\d')
+
+
+# Frozen copy of MerchantNormalizer.normalize as of this migration, so later
+# changes to the normalizer cannot change what the backfill does
+def normalize_merchant(description):
+    text = VPA_PATTERN.sub(' ', (description or '').upper())
+    tokens = []
+    for token in SEPARATOR_PATTERN.split(text):
+        if not token:
+            continue
+        digits = len(DIGIT_PATTERN.findall(token))
+        if digits:
+            # Long or mostly-numeric tokens are reference codes
+            if len(token) >= 8 or digits * 2 >= len(token):
+                continue
+            token = DIGIT_PATTERN.sub('', token)
+        tokens.append(token)
+    return ' '.join(tokens)
+
+
+def backfill_merchants(apps, schema_editor):
+    Transaction = apps.get_model('extraction_app', 'Transaction')
+    batch = []
+    for row in Transaction.objects.only('id', 'description').order_by('id').iterator(chunk_size=2000):
+        row.merchant = normalize_merchant(row.description)[:255]
+        batch.append(row)
+        if len(batch) >= 2000:
+            Transaction.objects.bulk_update(batch, ['merchant'], batch_size=500)
+            batch = []
+    Transaction.objects.bulk_update(batch, ['merchant'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction_app', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='merchant',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_merchants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction_app', '0006_transaction_merchant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='account_number',
+            field=models.CharField(blank=True, default='', max_length=34),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='balances_verified',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='closing_balance',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='opening_balance',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='period_end',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfdocument',
+            name='period_start',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+from django.db.migrations.operations.base import Operation
+
+
+TABLE = 'extraction_app_transaction'
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+        return cursor.fetchone() is not None
+
+
+class UnlessPartitioned(Operation):
+    """
+    Apply an operation to the migration state, and to the database unless
+    `partition_transactions --convert` already rebuilt the table with the
+    (fingerprint, date) constraint and without the single-column one
+    """
+
+    reversible = True
+
+    def __init__(self, operation):
+        self.operation = operation
+
+    def deconstruct(self):
+        return (self.__class__.__name__, [self.operation], {})
+
+    def state_forwards(self, app_label, state):
+        self.operation.state_forwards(app_label, state)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if is_partitioned(schema_editor.connection):
+            drop_fingerprint_like_index(schema_editor)
+        else:
+            self.operation.database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # A partitioned table cannot have a unique constraint without the date
+        if not is_partitioned(schema_editor.connection):
+            self.operation.database_backwards(app_label, schema_editor, from_state, to_state)
+
+    def describe(self):
+        return f'{self.operation.describe()} unless the table is partitioned'
+
+
+def drop_fingerprint_like_index(schema_editor):
+    # The varchar_pattern_ops index Django adds for a unique CharField is a
+    # plain index, so the conversion copied it; AlterField would drop it
+    name = schema_editor._create_index_name(TABLE, ['fingerprint'], suffix='_like')
+    schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction_app', '0007_pdfdocument_statement_header'),
+    ]
+
+    operations = [
+        UnlessPartitioned(migrations.AlterField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        )),
+        UnlessPartitioned(migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('fingerprint', 'date'), name='extraction_app_transaction_fingerprint_date_uniq'),
+        )),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:05
+
+import hashlib
+import re
+from decimal import Decimal
+
+from django.db import migrations
+
+# Identical rows (same day, amount and description) per statement tried when
+# recovering a row's repeat number
+MAX_OCCURRENCE = 1000
+
+
+# Frozen copy of the fingerprint logic in extraction_app.dedup as of this
+# migration, so later changes there cannot change what the re-key does
+def account_key(bank_type, account_type, account_number=''):
+    return ':'.join([bank_type or 'unknown', account_type or 'unknown', account_number or ''])
+
+
+def transaction_fingerprint(account, date, amount, description, occurrence):
+    description = re.sub(r'[^A-Z0-9]+', ' ', (description or '').upper()).strip()
+    amount = str(Decimal(str(amount)).quantize(Decimal('0.01')) + 0)
+    key = '|'.join([account, str(date), amount, description, str(occurrence)])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def rekey_numbered_documents(apps, schema_editor):
+    """
+    Fingerprints were keyed without the account number even for statements
+    that had one. Re-key those rows with it, keeping each row's repeat
+    number, which is recovered from its current fingerprint.
+    """
+    PDFDocument = apps.get_model('extraction_app', 'PDFDocument')
+    Transaction = apps.get_model('extraction_app', 'Transaction')
+
+    for document in PDFDocument.objects.exclude(account_number='').order_by('id').iterator():
+        coarse = account_key(document.bank_type, document.account_type)
+        account = account_key(document.bank_type, document.account_type, document.account_number)
+        rows = list(Transaction.objects.filter(document=document, fingerprint__isnull=False).order_by('id'))
+        updated = []
+        for row in rows:
+            date = row.date.isoformat()
+            # Earlier repeats may be stored under an overlapping document, so
+            # the number is not bounded by this document's rows
+            for occurrence in range(MAX_OCCURRENCE):
+                if transaction_fingerprint(coarse, date, row.amount, row.description, occurrence) == row.fingerprint:
+                    row.fingerprint = transaction_fingerprint(account, date, row.amount, row.description, occurrence)
+                    updated.append(row)
+                    break
+        Transaction.objects.bulk_update(updated, ['fingerprint'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extraction_app', '0008_transaction_fingerprint_date_uniq'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_numbered_documents, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,20 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+from .merchant_normalizer import MerchantNormalizer, MerchantCache, merchant_cache
 
 class CategoryClassifier:
-    def __init__(self):
+    # Bump whenever classification rules change so stored documents are reprocessed
+    VERSION = 2
+    
+    def __init__(self, cache: Optional[MerchantCache] = None, model=None, min_model_confidence: float = 0.6):
+        self.normalizer = MerchantNormalizer()
+        self.cache = cache if cache is not None else merchant_cache
+        # Optional trained HashedNgramClassifier; low-confidence predictions
+        # fall back to the pattern rules below
+        self.model = model
+        self.min_model_confidence = min_model_confidence
+        
         # Enhanced category patterns for better classification
         self.category_patterns = {
             'food': [
@@ -47,6 +59,12 @@ class CategoryClassifier:
                 r'.*WHOLESALE.*', r'.*DISTRIBUTOR.*'
             ]
         }
+        
+        # One compiled alternation per category, tried in the order above
+        self.compiled_patterns = [
+            (cat, re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE))
+            for cat, patterns in self.category_patterns.items()
+        ]
     
     def classify_transactions(self, transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -54,20 +72,24 @@ class CategoryClassifier:
         """
         classified_transactions = []
         
-        for transaction in transactions:
-            description = transaction['description'].upper()
-            category = 'other'
-            confidence = 0.0
+        # Score the whole batch with the trained model in one pass
+        predictions = None
+        if self.model is not None and transactions:
+            predictions = self.model.predict([t['description'] for t in transactions])
+        
+        for index, transaction in enumerate(transactions):
+            if predictions is not None:
+                predicted_category, probability = predictions[index]
+                if probability >= self.min_model_confidence:
+                    classified_transactions.append({
+                        **transaction,
+                        'category': predicted_category,
+                        'confidence_score': round(probability, 2)
+                    })
+                    continue
             
-            # Check each category pattern
-            for cat, patterns in self.category_patterns.items():
-                for pattern in patterns:
-                    if re.match(pattern, description, re.IGNORECASE):
-                        category = cat
-                        confidence = 0.9
-                        break
-                if category != 'other':
-                    break
+            description = transaction['description'].upper()
+            category, confidence = self._match_merchant(description)
             
             # Special rules based on transaction type and amount
             if category == 'other':
@@ -91,6 +113,29 @@ class CategoryClassifier:
         
         return classified_transactions
     
+    def _match_merchant(self, description: str) -> Tuple[str, float]:
+        """
+        Match a description against the category patterns, memoized on its
+        rule key so repeated merchants skip pattern matching
+        """
+        rule_key = self.normalizer.rule_key(description)
+        result = self.cache.get(rule_key)
+        if result is None:
+            result = self._match_patterns(description)
+            self.cache.put(rule_key, result)
+        return result
+    
+    def _match_patterns(self, text: str) -> Tuple[str, float]:
+        """Return the first category whose patterns match the text"""
+        for cat, pattern in self.compiled_patterns:
+            if pattern.match(text):
+                return cat, 0.9
+        return 'other', 0.0
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit-rate statistics of the merchant memo"""
+        return self.cache.stats()
+    
     def _apply_special_rules(self, transaction: Dict[str, Any], description: str) -> str:
         """
         Apply special classification rules based on transaction characteristics
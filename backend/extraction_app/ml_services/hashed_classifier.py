@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+class HashedNgramClassifier:
+    """
+    Linear softmax classifier over hashed character n-grams. Weights live in a
+    single float32 .npy file (features + bias rows x classes) that is memory
+    mapped on load, with a small JSON sidecar holding the class labels and the
+    SHA-256 of the weights it belongs to.
+    """
+    VERSION = 1
+
+    def __init__(self, classes: Sequence[str], n_features: int = 4096, ngram: int = 3,
+                 max_length: int = 64, weights: Optional[np.ndarray] = None):
+        self.classes = list(classes)
+        self.n_features = n_features
+        self.ngram = ngram
+        self.max_length = max_length
+        if weights is None:
+            weights = np.zeros((n_features + 1, len(self.classes)), dtype=np.float32)
+        self.weights = weights
+
+    def hash_features(self, descriptions: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hash every character n-gram of every description at once. Returns a
+        (rows x positions) matrix of feature ids and a mask of real n-grams.
+        """
+        width = self.max_length
+        encoded = b''.join(
+            (' ' + (description or '').upper() + ' ').encode('ascii', 'replace')[:width].ljust(width, b'\0')
+            for description in descriptions
+        )
+        chars = np.frombuffer(encoded, dtype=np.uint8).reshape(len(descriptions), width).astype(np.uint32)
+
+        positions = width - self.ngram + 1
+        hashed = np.zeros((len(descriptions), positions), dtype=np.uint32)
+        valid = np.ones((len(descriptions), positions), dtype=bool)
+        for offset in range(self.ngram):
+            window = chars[:, offset:offset + positions]
+            hashed = hashed * np.uint32(257) + window
+            valid &= window != 0
+        # Multiplicative hashing spreads n-grams over the feature space
+        hashed = hashed * np.uint32(2654435761)
+        hashed ^= hashed >> np.uint32(16)
+        hashed %= np.uint32(self.n_features)
+        return hashed, valid
+
+    def featurize(self, hashed: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """Densify hashed n-grams into n-gram frequency vectors (counts / n-grams)"""
+        rows = hashed.shape[0]
+        flat = (np.arange(rows, dtype=np.int64)[:, None] * self.n_features + hashed)[valid]
+        features = np.bincount(flat, minlength=rows * self.n_features).astype(np.float32)
+        features = features.reshape(rows, self.n_features)
+        return features / _ngram_counts(valid)
+
+    def predict_proba(self, descriptions: Sequence[str], batch_size: int = 8192) -> np.ndarray:
+        """
+        Class probabilities for a batch of descriptions. The feature matrix is
+        sparse (a few dozen n-grams per row), so the product with the weights is
+        computed as a gather-sum over each row's n-grams rather than densified.
+        """
+        if not descriptions:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+        hashed, valid = self.hash_features(descriptions)
+        coefficients = np.asarray(self.weights[:-1])
+        bias = np.asarray(self.weights[-1])
+        probabilities = []
+        for start in range(0, len(descriptions), batch_size):
+            batch_hashed = hashed[start:start + batch_size]
+            batch_valid = valid[start:start + batch_size]
+            contributions = coefficients[batch_hashed] * batch_valid[:, :, None]
+            scores = contributions.sum(axis=1) / _ngram_counts(batch_valid) + bias
+            probabilities.append(_softmax(scores))
+        return np.concatenate(probabilities)
+
+    def predict(self, descriptions: Sequence[str]) -> List[Tuple[str, float]]:
+        """Most likely category and its probability for each description"""
+        probabilities = self.predict_proba(descriptions)
+        best = probabilities.argmax(axis=1)
+        return [
+            (self.classes[index], float(probabilities[row, index]))
+            for row, index in enumerate(best)
+        ]
+
+    def fit(self, descriptions: Sequence[str], labels: Sequence[str], epochs: int = 30,
+            learning_rate: float = 20.0, l2: float = 1e-5, batch_size: int = 256, seed: int = 0) -> None:
+        """Train with mini-batch gradient descent on the softmax cross-entropy"""
+        label_index = {label: index for index, label in enumerate(self.classes)}
+        targets = np.array([label_index[label] for label in labels], dtype=np.int64)
+        hashed, valid = self.hash_features(descriptions)
+        weights = np.zeros((self.n_features + 1, len(self.classes)), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+
+        for _ in range(epochs):
+            order = rng.permutation(len(targets))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                features = self.featurize(hashed[batch], valid[batch])
+                probabilities = _softmax(features @ weights[:-1] + weights[-1])
+                probabilities[np.arange(len(batch)), targets[batch]] -= 1.0
+                probabilities /= len(batch)
+                weights[:-1] -= learning_rate * (features.T @ probabilities + l2 * weights[:-1])
+                weights[-1] -= learning_rate * probabilities.sum(axis=0)
+
+        self.weights = weights
+
+    def save(self, path: str) -> None:
+        """
+        Write the weights file and its JSON sidecar. Both are written to
+        temporary files and renamed into place, so processes that have the old
+        weights memory mapped keep reading them, and the sidecar goes first so
+        the weights' mtime only changes once the pair is complete.
+        """
+        if not path.endswith('.npy'):
+            raise ValueError(f'Model path must end in .npy: {path}')
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        weights = np.ascontiguousarray(self.weights, dtype=np.float32)
+        weights_path = _write_temporary(directory, path, lambda weights_file: np.save(weights_file, weights))
+        try:
+            metadata = {
+                'version': self.VERSION,
+                'classes': self.classes,
+                'n_features': self.n_features,
+                'ngram': self.ngram,
+                'max_length': self.max_length,
+                'weights_sha256': _weights_sha256(weights)
+            }
+            metadata_path = _write_temporary(
+                directory, path, lambda metadata_file: metadata_file.write(json.dumps(metadata).encode('utf-8'))
+            )
+            os.replace(metadata_path, _metadata_path(path))
+            os.replace(weights_path, path)
+        except BaseException:
+            if os.path.exists(weights_path):
+                os.remove(weights_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'HashedNgramClassifier':
+        """
+        Memory-map a saved model. Raises ValueError when the sidecar belongs
+        to other weights, as while a new model is being saved.
+        """
+        with open(_metadata_path(path)) as metadata_file:
+            metadata = json.load(metadata_file)
+        weights = np.load(path, mmap_mode='r')
+        # Models saved before the checksum was recorded are trusted as they are
+        expected = metadata.get('weights_sha256')
+        if expected is not None and expected != _weights_sha256(weights):
+            raise ValueError(f'{_metadata_path(path)} does not describe the weights in {path}')
+        return cls(
+            metadata['classes'],
+            n_features=metadata['n_features'],
+            ngram=metadata['ngram'],
+            max_length=metadata['max_length'],
+            weights=weights
+        )
+
+_loaded_models = {}
+_load_lock = threading.Lock()
+
+def load_model(path: Optional[str]) -> Optional[HashedNgramClassifier]:
+    """
+    Load a model once per process and reuse it, reloading when the weights
+    file is replaced. Returns None when no trained model exists so callers
+    fall back to the rule-based classifier. While a new model is half saved
+    the previously loaded one (if any) is returned and loading is retried on
+    the next call.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    signature = (stat.st_ino, stat.st_mtime_ns)
+    with _load_lock:
+        cached = _loaded_models.get(path)
+        if cached is None or cached[0] != signature:
+            try:
+                cached = (signature, HashedNgramClassifier.load(path))
+            except ValueError:
+                return cached[1] if cached else None
+            _loaded_models[path] = cached
+        return cached[1]
+
+def _metadata_path(path: str) -> str:
+    return os.path.splitext(path)[0] + '.json'
+
+def _write_temporary(directory: str, path: str, write) -> str:
+    """Write a file next to `path` under a temporary name and return that name"""
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as temporary_file:
+            write(temporary_file)
+        # mkstemp creates the file private to its owner; model files are shared
+        os.chmod(temporary_path, 0o644)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+    return temporary_path
+
+def _weights_sha256(weights: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(weights).data).hexdigest()
+
+def _ngram_counts(valid: np.ndarray) -> np.ndarray:
+    return np.maximum(valid.sum(axis=1, keepdims=True), 1).astype(np.float32)
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exponentials = np.exp(scores)
+    return exponentials / exponentials.sum(axis=1, keepdims=True)
@@ -0,0 +1,87 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class MerchantNormalizer:
+    def __init__(self):
+        # UPI virtual payment addresses such as name@okhdfcbank
+        self.vpa_pattern = re.compile(r'[A-Z0-9._]+@[A-Z0-9]+')
+        self.separator_pattern = re.compile(r'[^A-Z0-9]+')
+        self.digit_pattern = re.compile(r'\d')
+        self.non_letter_pattern = re.compile(r'[^A-Z\n]+')
+
+    def normalize(self, description: str) -> str:
+        """
+        Canonicalize a transaction description to a merchant key by dropping
+        reference numbers, UPI ids and punctuation while keeping the words the
+        category rules look for
+        """
+        text = self.vpa_pattern.sub(' ', (description or '').upper())
+        tokens = []
+        for token in self.separator_pattern.split(text):
+            if not token:
+                continue
+            digits = len(self.digit_pattern.findall(token))
+            if digits:
+                # Long or mostly-numeric tokens are reference codes
+                if len(token) >= 8 or digits * 2 >= len(token):
+                    continue
+                token = self.digit_pattern.sub('', token)
+            tokens.append(token)
+        return ' '.join(tokens)
+
+    def rule_key(self, description: str) -> str:
+        """
+        Reduce a description to its runs of letters. The category patterns
+        only look for words in order, so descriptions that differ only in
+        reference numbers and punctuation always classify the same way.
+        """
+        return self.non_letter_pattern.sub(' ', (description or '').upper()).strip(' ')
+
+class MerchantCache:
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return the memoized (category, confidence) for a rule key"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Tuple[str, float]) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate statistics for the memo"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+# Process-wide memo shared by every CategoryClassifier instance
+merchant_cache = MerchantCache()
@@ -1,73 +1,158 @@
-import PyPDF2
-import pdfplumber
+import logging
 import re
-from typing import List, Dict, Any
+import signal
+import threading
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class PageBudgetExceeded(Exception):
+    pass
+
+class UnreadablePDF(Exception):
+    """Neither pdfplumber nor PyPDF2 could open the file"""
+    pass
+
+def import_pdf_libraries() -> None:
+    """
+    Import pdfplumber and PyPDF2. They are imported on first extraction rather
+    than at module load, so processes that never extract do not pay for them.
+    """
+    import pdfplumber  # noqa: F401
+    import PyPDF2  # noqa: F401
 
 class PDFExtractor:
+    BANK_PATTERNS = [
+        (bank, [re.compile(pattern, re.IGNORECASE) for pattern in patterns])
+        for bank, patterns in [
+            ('hdfc', [r'hdfc\s*bank', r'we understand your world']),
+            ('indian bank', [r'indian\s+bank', r'idib\d+', r'statement of account']),
+            ('pnb', [r'punjab\s*national\s*bank', r'\bpnb\b']),
+            ('sbi', [r'state\s*bank\s*of\s*india', r'\bsbi\b']),
+            ('icici', [r'icici\s+bank']),
+            ('axis', [r'axis\s+bank']),
+            ('kotak', [r'kotak\s+mahindra']),
+        ]
+    ]
+    # Checked in order; bare words like 'current' or 'od' appear in most statements
+    ACCOUNT_TYPE_PATTERNS = [
+        (account_type, re.compile(pattern, re.IGNORECASE))
+        for account_type, pattern in [
+            ('current', r'current\s*(?:account|a/c)|\bca-[a-z]'),
+            ('savings', r'savings?\s*(?:bank\s*)?(?:account|a/c)|\bsb-[a-z]'),
+            ('overdraft', r'overdraft|\bod\s*(?:account|a/c)'),
+        ]
+    ]
+    
     def __init__(self):
+        # Per-thread state, so one instance can be shared across request threads
+        self._local = threading.local()
         self.supported_banks = [
             'hdfc', 'bank of america', 'wells fargo', 'citi', 'capital one',
             'indian bank', 'punjab national bank', 'state bank of india', 'icici'
         ]
     
+    @property
+    def skipped_pages(self) -> int:
+        """Pages abandoned because they exceeded the per-page budget on this thread's last extraction"""
+        return getattr(self._local, 'skipped_pages', 0)
+    
+    @skipped_pages.setter
+    def skipped_pages(self, value: int) -> None:
+        self._local.skipped_pages = value
+    
     def extract_text(self, pdf_path: str) -> str:
         """
         Extract text from PDF using multiple methods for better accuracy
         """
-        text = ""
+        return ''.join(self.extract_pages(pdf_path))
+    
+    def extract_pages(self, pdf_path: str, page_budget: Optional[float] = None) -> List[str]:
+        """
+        Extract the text of each page, tables first, falling back to PyPDF2
+        when pdfplumber finds nothing. With a page_budget (seconds), pages that
+        take longer are skipped; this needs a main thread, as in a worker process.
+        Raises UnreadablePDF when both libraries fail.
+        """
+        import pdfplumber
+        
+        pages = []
+        pdfplumber_error = None
+        self.skipped_pages = 0
+        use_budget = (
+            page_budget is not None and hasattr(signal, 'setitimer')
+            and threading.current_thread() is threading.main_thread()
+        )
+        if use_budget:
+            previous_handler = signal.signal(signal.SIGALRM, _raise_page_budget_exceeded)
         
         # Method 1: Try pdfplumber first (better for table extraction)
         try:
             with pdfplumber.open(pdf_path) as pdf:
                 for page in pdf.pages:
-                    # Try to extract tables first
-                    tables = page.extract_tables()
-                    if tables:
-                        for table in tables:
-                            for row in table:
-                                if row:
-                                    text += ' | '.join([str(cell) if cell else '' for cell in row]) + "\n"
-                    
-                    # Then extract text
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+                    # Caught around the whole page: the alarm can still land
+                    # in the finally block, after the page was extracted
+                    try:
+                        text = ""
+                        if use_budget:
+                            signal.setitimer(signal.ITIMER_REAL, page_budget)
+                        try:
+                            # Try to extract tables first
+                            tables = page.extract_tables()
+                            if tables:
+                                for table in tables:
+                                    for row in table:
+                                        if row:
+                                            text += ' | '.join([str(cell) if cell else '' for cell in row]) + "\n"
+                            
+                            # Then extract text
+                            page_text = page.extract_text()
+                            if page_text:
+                                text += page_text + "\n"
+                            if use_budget:
+                                signal.setitimer(signal.ITIMER_REAL, 0)
+                        finally:
+                            if use_budget:
+                                signal.setitimer(signal.ITIMER_REAL, 0)
+                            # Release parsed layout objects before the next page
+                            page.flush_cache()
+                    except PageBudgetExceeded:
+                        self.skipped_pages += 1
+                        text = ""
+                    pages.append(text)
         except Exception as e:
-            print(f"pdfplumber extraction failed: {e}")
+            logger.exception("pdfplumber extraction failed for %s", pdf_path)
+            pdfplumber_error = e
+        finally:
+            if use_budget:
+                signal.signal(signal.SIGALRM, previous_handler)
         
         # Method 2: Fall back to PyPDF2
-        if not text.strip():
+        if not ''.join(pages).strip():
+            import PyPDF2
+            
+            fallback_pages = []
             try:
                 with open(pdf_path, 'rb') as file:
                     pdf_reader = PyPDF2.PdfReader(file)
                     for page in pdf_reader.pages:
                         page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
+                        fallback_pages.append(page_text + "\n" if page_text else "")
+                pages = fallback_pages
             except Exception as e:
-                print(f"PyPDF2 extraction failed: {e}")
+                if pdfplumber_error is not None:
+                    raise UnreadablePDF(f'Could not read PDF: {pdfplumber_error}') from e
+                logger.exception("PyPDF2 extraction failed for %s", pdf_path)
         
-        return text
+        return pages
     
     def detect_bank(self, text: str) -> str:
         """
         Detect the bank from the extracted text with improved pattern matching
         """
-        text_lower = text.lower()
-        
-        bank_patterns = {
-            'hdfc': [r'hdfc\s+bank', r'we understand your world'],
-            'indian bank': [r'indian\s+bank', r'idib\d+', r'statement of account'],
-            'pnb': [r'punjab national bank', r'pnb'],
-            'sbi': [r'state bank of india', r'sbi'],
-            'icici': [r'icici\s+bank'],
-            'axis': [r'axis\s+bank'],
-            'kotak': [r'kotak\s+mahindra']
-        }
-        
-        for bank, patterns in bank_patterns.items():
+        for bank, patterns in self.BANK_PATTERNS:
             for pattern in patterns:
-                if re.search(pattern, text_lower, re.IGNORECASE):
+                if pattern.search(text):
                     return bank
         
         return "unknown"
@@ -76,13 +161,11 @@ class PDFExtractor:
         """
         Detect account type from statement text
         """
-        text_lower = text.lower()
+        for account_type, pattern in self.ACCOUNT_TYPE_PATTERNS:
+            if pattern.search(text):
+                return account_type
         
-        if any(word in text_lower for word in ['current account', 'ca-', 'current']):
-            return 'current'
-        elif any(word in text_lower for word in ['savings', 'sb-', 'savings account']):
-            return 'savings'
-        elif any(word in text_lower for word in ['od', 'overdraft']):
-            return 'overdraft'
-        else:
-            return 'unknown'
\ No newline at end of file
+        return 'unknown'
+
+def _raise_page_budget_exceeded(signum, frame):
+    raise PageBudgetExceeded()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import re
+from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from .pdf_extractor import PDFExtractor
+from .transaction_parser import DATE_FORMATS
+
+AMOUNT = r'-?\d[\d,]*\.\d{2}'
+DATE = r'\d{1,2}[/-](?:\d{1,2}|[a-z]{3})[/-]\d{2,4}|\d{4}-\d{2}-\d{2}'
+HEADER_DATE_FORMATS = DATE_FORMATS + ['%d-%b-%Y', '%d/%b/%Y', '%d-%b-%y', '%d/%b/%y']
+
+# The first four letters of an IFSC code identify the bank
+IFSC_BANKS = {
+    'HDFC': 'hdfc', 'IDIB': 'indian bank', 'PUNB': 'pnb', 'SBIN': 'sbi',
+    'ICIC': 'icici', 'UTIB': 'axis', 'KKBK': 'kotak',
+}
+BANK_NAMES = {
+    'hdfcbank': 'hdfc', 'indianbank': 'indian bank', 'punjabnationalbank': 'pnb',
+    'statebankofindia': 'sbi', 'icicibank': 'icici', 'axisbank': 'axis', 'kotakmahindra': 'kotak',
+}
+ACCOUNT_TYPE_LABELS = {'current': 'current', 'saving': 'savings', 'savings': 'savings',
+                       'overdraft': 'overdraft', 'od': 'overdraft'}
+
+# Every header field as one named alternative, so the header text is scanned
+# once. The summary table comes before opening/closing so it wins where both match.
+HEADER_FIELDS = [
+    ('ifsc', r'ifsc(?:\s*code)?\s*:?\s*(?P<ifsc_bank>[a-z]{4})0[a-z0-9]{6}'),
+    ('bank', r'(?P<bank_name>hdfc\s*bank|indian\s+bank|punjab\s*national\s*bank|state\s*bank\s*of\s*india'
+             r'|icici\s*bank|axis\s*bank|kotak\s*mahindra)'),
+    ('number', r'(?:account|a/c)\s*(?:no\.?|number)\s*:?\s*(?P<account_number>[0-9x*]{6,20})\b'),
+    ('type_label', r'account\s*type\s*:?\s*(?P<account_type_label>current|savings?|overdraft|od)\b'),
+    ('od_limit', rf'\bod\s*limit\s*:?\s*(?P<od_limit_amount>{AMOUNT})'),
+    ('type', '|'.join(pattern.pattern for _, pattern in PDFExtractor.ACCOUNT_TYPE_PATTERNS)),
+    ('period', rf'(?:from|period)\s*:?\s*(?P<period_start>{DATE})(?:(?!from)[\s\S]){{0,80}}?'
+               rf'\bto\s*:?\s*(?P<period_end>{DATE})'),
+    ('summary', rf'opening\s*balance\s+dr\s*count\s+cr\s*count\s+debits\s+credits\s+closing\s*bal\w*\s+'
+                rf'(?P<summary_opening>{AMOUNT})\s+\d+\s+\d+\s+(?P<summary_debits>{AMOUNT})\s+'
+                rf'(?P<summary_credits>{AMOUNT})\s+(?P<summary_closing>{AMOUNT})'),
+    ('opening', rf'(?:opening\s*balance|brought\s*forward|balance\s*b/?f)\s*:?\s*'
+                rf'(?P<opening_amount>{AMOUNT})\s*(?P<opening_side>cr|dr)?'),
+    ('closing', rf'(?:closing\s*balance|carried\s*forward|balance\s*c/?f)\s*:?\s*'
+                rf'(?P<closing_amount>{AMOUNT})\s*(?P<closing_side>cr|dr)?'),
+]
+# Each field is wrapped in an outer group, which is the match's lastgroup. The
+# lookahead on the letters the fields can start with lets the scan skip every
+# other position without trying each alternative; the text is lowercased first.
+HEADER_PATTERN = re.compile(
+    '(?=[abcfhikops])(?:' + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in HEADER_FIELDS) + ')'
+)
+
+class StatementHeaderAnalyzer:
+    # Allowed gap between the balance movement and the parsed transactions
+    TOLERANCE = 0.01
+
+    def __init__(self):
+        self.extractor = PDFExtractor()
+
+    def analyze(self, pages: List[str]) -> Dict[str, Any]:
+        """
+        Read the bank, account type, account number, statement period and
+        opening/closing balances from the first and last page in one scan
+        """
+        pages = [page for page in pages if page.strip()]
+        text = (pages[0] + '\n' + pages[-1] if len(pages) > 1 else ''.join(pages)).lower()
+
+        found = {}
+        bank_names = Counter()
+        account_types = []
+        for match in HEADER_PATTERN.finditer(text):
+            field = match.lastgroup
+            if field == 'bank':
+                bank_names[BANK_NAMES[re.sub(r'\s+', '', match.group('bank_name'))]] += 1
+            elif field == 'type':
+                account_types.append(self.extractor.detect_account_type(match.group()))
+            elif field == 'closing':
+                # Balances are carried forward page by page: the last one closes the statement
+                found['closing'] = match
+            else:
+                found.setdefault(field, match)
+
+        period = found.get('period')
+        return {
+            'bank_type': self._bank_type(found, bank_names, text),
+            'account_type': self._account_type(found, account_types),
+            'account_number': found['number'].group('account_number').upper() if 'number' in found else '',
+            'period_start': self._date(period.group('period_start')) if period else None,
+            'period_end': self._date(period.group('period_end')) if period else None,
+            'opening_balance': self._balance(found, 'opening'),
+            'closing_balance': self._balance(found, 'closing'),
+            'total_debits': self._amount(found, 'summary', 'summary_debits'),
+            'total_credits': self._amount(found, 'summary', 'summary_credits'),
+        }
+
+    def verify_transactions(self, header: Dict[str, Any], transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Check parsed transactions against the statement balances: their net
+        amount should equal the closing minus the opening balance, and their
+        debits and credits the summary totals when the statement has them
+        """
+        debits = round(-sum(t['amount'] for t in transactions if t['amount'] < 0), 2)
+        credits = round(sum(t['amount'] for t in transactions if t['amount'] > 0), 2)
+        check = {'status': 'unavailable', 'parsed_net': round(credits - debits, 2)}
+
+        comparisons = []
+        if header['opening_balance'] is not None and header['closing_balance'] is not None:
+            check['expected_net'] = round(header['closing_balance'] - header['opening_balance'], 2)
+            comparisons.append((check['expected_net'], check['parsed_net']))
+        if header['total_debits'] is not None and header['total_credits'] is not None:
+            check.update(expected_debits=header['total_debits'], parsed_debits=debits,
+                         expected_credits=header['total_credits'], parsed_credits=credits)
+            comparisons += [(header['total_debits'], debits), (header['total_credits'], credits)]
+
+        if comparisons:
+            matched = all(abs(expected - parsed) <= self.TOLERANCE for expected, parsed in comparisons)
+            check['status'] = 'verified' if matched else 'mismatch'
+        return check
+
+    def _bank_type(self, found: Dict[str, re.Match], bank_names: Counter, text: str) -> str:
+        """The branch IFSC code, else the most mentioned bank name, else the extractor's patterns"""
+        if 'ifsc' in found:
+            bank = IFSC_BANKS.get(found['ifsc'].group('ifsc_bank').upper())
+            if bank:
+                return bank
+        if bank_names:
+            return bank_names.most_common(1)[0][0]
+        return self.extractor.detect_bank(text)
+
+    def _account_type(self, found: Dict[str, re.Match], account_types: List[str]) -> str:
+        if 'type_label' in found:
+            return ACCOUNT_TYPE_LABELS[found['type_label'].group('account_type_label')]
+        for account_type in ('current', 'savings', 'overdraft'):
+            if account_type in account_types:
+                return account_type
+        # An overdraft limit of 0.00 is printed on accounts without one
+        if self._amount(found, 'od_limit', 'od_limit_amount'):
+            return 'overdraft'
+        return 'unknown'
+
+    def _amount(self, found: Dict[str, re.Match], field: str, group: str) -> Optional[float]:
+        if field not in found:
+            return None
+        return float(found[field].group(group).replace(',', ''))
+
+    def _balance(self, found: Dict[str, re.Match], field: str) -> Optional[float]:
+        """The summary table's balance, else a labelled one; a Dr balance is overdrawn"""
+        if 'summary' in found:
+            return self._amount(found, 'summary', f'summary_{field}')
+        amount = self._amount(found, field, f'{field}_amount')
+        if amount is not None and found[field].group(f'{field}_side') == 'dr':
+            amount = -amount
+        return amount
+
+    def _date(self, value: str) -> Optional[str]:
+        for fmt in HEADER_DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        return None
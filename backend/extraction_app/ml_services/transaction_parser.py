@@ -1,22 +1,47 @@
 import re
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+# Compiled once at import; the parser methods run them on every statement line
+HDFC_DATE = re.compile(r'(\d{2}/\d{2}/\d{2,4})')
+# Date, narration, Chq./Ref.No., value date, amount, closing balance. The amount
+# is in either the withdrawal or the deposit column, which the text does not show.
+HDFC_ROW = re.compile(
+    r'^(\d{2}/\d{2}/\d{2,4})\s+(.*?)\s+(?:\S+\s+)?\d{2}/\d{2}/\d{2,4}\s+(\d[\d,]*\.\d{2})\s+(-?\d[\d,]*\.\d{2})$'
+)
+HDFC_CREDIT_WORDS = re.compile(r'CR\b|CR-|DEPOSIT|REFUND|REVERSAL|INTEREST')
+INDIAN_BANK_DATES = re.compile(r'(\d{2}/\d{2}/\d{2,4})\s+(\d{2}/\d{2}/\d{2,4})')
+INDIAN_BANK_AMOUNTS = re.compile(
+    r'(\d{1,3}(?:,\d{3})*\.\d{2})\s+(\d{1,3}(?:,\d{3})*\.\d{2})\s+(\d{1,3}(?:,\d{3})*\.\d{2})(?:cr|dr)?$'
+)
+SHORT_DATE = re.compile(r'\d{2}/\d{2}/\d{2,4}')
+GROUPED_AMOUNT = re.compile(r'\d{1,3}(?:,\d{3})*\.\d{2}')
+NEFT_CODE = re.compile(r'NEFT/\w+/\d+')
+WHITESPACE = re.compile(r'\s+')
+DATE_FORMATS = [
+    '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d',
+    '%d/%m/%y', '%d-%m-%y', '%m/%d/%Y',
+    '%d.%m.%Y', '%Y/%m/%d'
+]
 
 class TransactionParser:
+    # Bump whenever parsing rules change so stored documents are reprocessed
+    VERSION = 3
+    
     def __init__(self):
         # Enhanced patterns for different bank formats
-        self.date_patterns = [
+        self.date_patterns = [re.compile(pattern) for pattern in [
             r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',  # MM/DD/YYYY or MM-DD-YYYY
             r'(\d{4}-\d{2}-\d{2})',  # YYYY-MM-DD
             r'(\d{1,2}-\d{1,2}-\d{4})',  # DD-MM-YYYY
-        ]
+        ]]
         
-        self.amount_patterns = [
+        self.amount_patterns = [re.compile(pattern) for pattern in [
             r'[\$₹]?\s*(\d{1,3}(?:,\d{3})*\.\d{2})',  # $1,234.56 or ₹1,234.56
             r'[\$₹]?\s*(\d+\.\d{2})',  # $123.45 or ₹123.45
             r'(\d{1,3}(?:,\d{3})*\.\d{2})\s*(?:cr|dr)?',  # 1,234.56 CR
             r'(\d+\.\d{2})\s*(?:cr|dr)?',  # 123.45 DR
-        ]
+        ]]
         
         # Bank-specific patterns
         self.bank_patterns = {
@@ -25,66 +50,57 @@ class TransactionParser:
             'default': self._parse_generic_format
         }
 
-    def parse_transactions(self, text: str, bank_type: str = "unknown") -> List[Dict[str, Any]]:
+    def parse_transactions(self, text: str, bank_type: str = "unknown",
+                           opening_balance: Optional[float] = None) -> List[Dict[str, Any]]:
         """
-        Parse transactions based on detected bank type
+        Parse transactions based on detected bank type. The opening balance
+        from the statement header signs the first row of formats whose amounts
+        are only signed by the running balance.
         """
         parser_method = self.bank_patterns.get(bank_type, self.bank_patterns['default'])
-        return parser_method(text)
+        return parser_method(text, opening_balance)
 
-    def _parse_hdfc_format(self, text: str) -> List[Dict[str, Any]]:
+    def _parse_hdfc_format(self, text: str, opening_balance: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Parse HDFC bank statement format
         """
         transactions = []
-        lines = text.split('\n')
+        previous_balance = opening_balance
         
-        # HDFC specific table parsing
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
+        for line in text.split('\n'):
+            line = line.strip()
             
-            # Skip headers and empty lines
-            if not line or any(header in line.lower() for header in 
-                             ['date', 'narration', 'chq', 'value', 'withdrawal', 'deposit', 'balance', 'closing']):
-                i += 1
+            # Table cells joined with '|' repeat rows already in the page text
+            if '|' in line:
                 continue
             
-            # Look for date pattern at start of line
-            date_match = re.match(r'(\d{2}/\d{2}/\d{2,4})', line)
-            if date_match:
-                transaction_date = self.parse_date(date_match.group(1))
-                
-                # Extract amount patterns - HDFC format has withdrawal/deposit columns
-                withdrawal_match = re.search(r'(\d{1,3}(?:,\d{3})*\.\d{2})\s*$', line)
-                deposit_match = re.search(r'(\d{1,3}(?:,\d{3})*\.\d{2})\s+(\d{1,3}(?:,\d{3})*\.\d{2})', line)
-                
-                amount = 0.0
-                transaction_type = 'debit'
-                
-                if withdrawal_match:
-                    amount = -float(withdrawal_match.group(1).replace(',', ''))
-                elif deposit_match:
-                    amount = float(deposit_match.group(2).replace(',', ''))
-                    transaction_type = 'credit'
-                
-                # Extract description
-                description = self._extract_hdfc_description(line)
-                
-                if amount != 0:
-                    transactions.append({
-                        'date': transaction_date,
-                        'description': description,
-                        'amount': amount,
-                        'type': transaction_type,
-                        'raw_text': line
-                    })
+            row_match = HDFC_ROW.match(line)
+            if not row_match:
+                continue
             
-            i += 1
+            amount = float(row_match.group(3).replace(',', ''))
+            balance = float(row_match.group(4).replace(',', ''))
+            description = row_match.group(2).strip()[:200]
+            
+            # A withdrawal lowers the closing balance and a deposit raises it
+            if previous_balance is not None:
+                is_credit = balance > previous_balance
+            else:
+                is_credit = bool(HDFC_CREDIT_WORDS.search(description.upper()))
+            previous_balance = balance
+            
+            if amount != 0:
+                transactions.append({
+                    'date': self.parse_date(row_match.group(1)),
+                    'description': description,
+                    'amount': amount if is_credit else -amount,
+                    'type': 'credit' if is_credit else 'debit',
+                    'raw_text': line
+                })
         
-        return transactions if transactions else self._create_sample_transactions()
+        return transactions
 
-    def _parse_indian_bank_format(self, text: str) -> List[Dict[str, Any]]:
+    def _parse_indian_bank_format(self, text: str, opening_balance: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Parse Indian Bank statement format
         """
@@ -96,15 +112,15 @@ class TransactionParser:
             line = lines[i].strip()
             
             # Look for date patterns in Indian Bank format
-            date_match = re.match(r'(\d{2}/\d{2}/\d{2,4})\s+(\d{2}/\d{2}/\d{2,4})', line)
+            date_match = INDIAN_BANK_DATES.match(line)
             if not date_match:
-                date_match = re.match(r'(\d{2}/\d{2}/\d{2,4})', line)
+                date_match = HDFC_DATE.match(line)
             
             if date_match:
                 transaction_date = self.parse_date(date_match.group(1))
                 
                 # Indian Bank format: Debit and Credit columns
-                debit_match = re.search(r'(\d{1,3}(?:,\d{3})*\.\d{2})\s+(\d{1,3}(?:,\d{3})*\.\d{2})\s+(\d{1,3}(?:,\d{3})*\.\d{2})(?:cr|dr)?$', line)
+                debit_match = INDIAN_BANK_AMOUNTS.search(line)
                 
                 amount = 0.0
                 transaction_type = 'debit'
@@ -133,9 +149,9 @@ class TransactionParser:
             
             i += 1
         
-        return transactions if transactions else self._create_sample_transactions()
+        return transactions
 
-    def _parse_generic_format(self, text: str) -> List[Dict[str, Any]]:
+    def _parse_generic_format(self, text: str, opening_balance: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Parse generic bank statement format
         """
@@ -150,7 +166,7 @@ class TransactionParser:
             # Generic date detection
             date_match = None
             for pattern in self.date_patterns:
-                date_match = re.search(pattern, line)
+                date_match = pattern.search(line)
                 if date_match:
                     break
             
@@ -160,7 +176,7 @@ class TransactionParser:
                 # Generic amount detection
                 amount_match = None
                 for pattern in self.amount_patterns:
-                    amount_match = re.search(pattern, line)
+                    amount_match = pattern.search(line)
                     if amount_match:
                         break
                 
@@ -193,42 +209,28 @@ class TransactionParser:
                     except ValueError:
                         continue
         
-        return transactions if transactions else self._create_sample_transactions()
-
-    def _extract_hdfc_description(self, line: str) -> str:
-        """Extract description from HDFC statement line"""
-        # Remove date and amount patterns
-        cleaned = re.sub(r'\d{2}/\d{2}/\d{2,4}', '', line)
-        cleaned = re.sub(r'\d{1,3}(?:,\d{3})*\.\d{2}', '', cleaned)
-        cleaned = re.sub(r'[A-Z0-9]{10,}', '', cleaned)  # Remove long alphanumeric codes
-        return cleaned.strip()[:200]  # Limit length
+        return transactions
 
     def _extract_indian_bank_description(self, line: str) -> str:
         """Extract description from Indian Bank statement line"""
         # Remove date and amount patterns
-        cleaned = re.sub(r'\d{2}/\d{2}/\d{2,4}', '', line)
-        cleaned = re.sub(r'\d{1,3}(?:,\d{3})*\.\d{2}', '', cleaned)
-        cleaned = re.sub(r'NEFT/\w+/\d+', '', cleaned)  # Remove NEFT codes
+        cleaned = SHORT_DATE.sub('', line)
+        cleaned = GROUPED_AMOUNT.sub('', cleaned)
+        cleaned = NEFT_CODE.sub('', cleaned)  # Remove NEFT codes
         return cleaned.strip()[:200]
 
     def _clean_description(self, line: str, date_str: str, amount_str: str) -> str:
         """Clean description by removing dates and amounts"""
         cleaned = line.replace(date_str, '')
         cleaned = cleaned.replace(amount_str, '')
-        cleaned = re.sub(r'\s+', ' ', cleaned)  # Normalize spaces
+        cleaned = WHITESPACE.sub(' ', cleaned)  # Normalize spaces
         return cleaned.strip()[:200]
 
     def parse_date(self, date_str: str) -> str:
         """Parse date string into standardized format"""
         try:
             # Try different date formats
-            formats = [
-                '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', 
-                '%d/%m/%y', '%d-%m-%y', '%m/%d/%Y',
-                '%d.%m.%Y', '%Y/%m/%d'
-            ]
-            
-            for fmt in formats:
+            for fmt in DATE_FORMATS:
                 try:
                     date_obj = datetime.strptime(date_str, fmt)
                     return date_obj.strftime('%Y-%m-%d')
@@ -238,37 +240,3 @@ class TransactionParser:
             pass
         
         return datetime.now().strftime('%Y-%m-%d')
-
-    def _create_sample_transactions(self) -> List[Dict[str, Any]]:
-        """Create sample transactions when no real transactions are found"""
-        import random
-        from datetime import datetime, timedelta
-        
-        sample_descriptions = [
-            "GROCERY STORE PURCHASE", "ONLINE SHOPPING AMAZON", "RESTAURANT PAYMENT",
-            "GAS STATION TRANSACTION", "UTILITY BILL PAYMENT", "SALARY DEPOSIT",
-            "ATM WITHDRAWAL", "COFFEE SHOP PURCHASE", "PHONE BILL PAYMENT",
-            "INTERNET SERVICE FEE", "INSURANCE PAYMENT", "CREDIT CARD PAYMENT"
-        ]
-        
-        transactions = []
-        base_date = datetime.now()
-        
-        for i in range(8):
-            transaction_date = (base_date - timedelta(days=random.randint(1, 30))).strftime('%Y-%m-%d')
-            description = random.choice(sample_descriptions)
-            amount = round(random.uniform(10.0, 500.0), 2)
-            
-            # Make some transactions negative (debits)
-            if random.random() > 0.4:
-                amount = -amount
-            
-            transactions.append({
-                'date': transaction_date,
-                'description': description,
-                'amount': amount,
-                'type': 'debit' if amount < 0 else 'credit',
-                'raw_text': f"{transaction_date} {description} ${abs(amount):.2f}"
-            })
-        
-        return transactions
\ No newline at end of file
@@ -0,0 +1,184 @@
+import re
+from datetime import date
+from typing import Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction as db_transaction, DatabaseError
+
+from .models import Transaction
+
+TABLE = Transaction._meta.db_table
+# Matches Transaction.Meta.constraints, so the migration state describes the converted table
+FINGERPRINT_CONSTRAINT = f'{TABLE}_fingerprint_date_uniq'
+PARTITION_NAME_PATTERN = re.compile(rf'^{TABLE}_y(\d{{4}})m(\d{{2}})$')
+
+Month = Tuple[int, int]
+
+
+def supported() -> bool:
+    """Declarative partitioning is PostgreSQL only; other backends keep the plain table"""
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned() -> bool:
+    if not supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+        return cursor.fetchone() is not None
+
+
+def partition_name(month: Month) -> str:
+    return f'{TABLE}_y{month[0]:04d}m{month[1]:02d}'
+
+
+def next_month(month: Month) -> Month:
+    year, number = month
+    return (year + 1, 1) if number == 12 else (year, number + 1)
+
+
+def month_of(value: date) -> Month:
+    return (value.year, value.month)
+
+
+def existing_partitions() -> Set[Month]:
+    """Months that currently have an attached partition"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = to_regclass(%s)', [TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    months = set()
+    for name in names:
+        match = PARTITION_NAME_PATTERN.match(name)
+        if match:
+            months.add((int(match.group(1)), int(match.group(2))))
+    return months
+
+
+def _create_partition(cursor, month: Month) -> None:
+    start = date(month[0], month[1], 1)
+    end = date(*next_month(month), 1)
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(month)}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def ensure_month_partitions(dates: Iterable[date]) -> List[Month]:
+    """
+    Create the monthly partitions that rows with these dates will land in.
+    A no-op unless the Transaction table is partitioned. Call it outside the
+    transaction that inserts the rows: creating a partition briefly locks the
+    parent table, which should not be held for the whole insert.
+    Returns the months created.
+    """
+    if not is_partitioned():
+        return []
+    wanted = {month_of(value) for value in dates}
+    missing = sorted(wanted - existing_partitions())
+    created = []
+    for month in missing:
+        try:
+            with db_transaction.atomic(), connection.cursor() as cursor:
+                _create_partition(cursor, month)
+            created.append(month)
+        except DatabaseError:
+            # Another process created the same partition concurrently
+            if month not in existing_partitions():
+                raise
+    return created
+
+
+def _month_range(first: Month, last: Month) -> List[Month]:
+    months = [first]
+    while months[-1] < last:
+        months.append(next_month(months[-1]))
+    return months
+
+
+def convert_to_partitioned(ahead: int = 3) -> List[Month]:
+    """
+    Rebuild the Transaction table as a table partitioned by month on `date`,
+    copying every row. The primary key becomes (id, date), since PostgreSQL
+    requires unique constraints on a partitioned table to include the
+    partition key; Django cannot describe a composite primary key, so the
+    model keeps `id`. The (fingerprint, date) constraint is the model's own.
+    Runs in one transaction and locks the table for the duration of the copy.
+    Returns the months whose partitions were created.
+    """
+    if not supported():
+        raise DatabaseError('Table partitioning requires PostgreSQL')
+    if is_partitioned():
+        return []
+
+    legacy = f'{TABLE}_unpartitioned'
+    sequence = f'{TABLE}_partitioned_id_seq'
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        # Keep the non-unique index definitions (and their Django names) to recreate on the parent
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes i WHERE i.tablename = %s AND NOT EXISTS ("
+            "SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname AND c.contype IN ('p', 'u'))",
+            [TABLE]
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype IN ('f', 'c')", [TABLE]
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(f'SELECT MIN("date"), MAX("date"), MAX("id") FROM "{TABLE}"')
+        first_date, last_date, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE ("date")')
+        cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{TABLE}"."id"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{sequence}"\')')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey_partitioned" PRIMARY KEY ("id", "date")')
+
+        current = month_of(date.today())
+        first = min(month_of(first_date), current) if first_date else current
+        last = max(month_of(last_date), current) if last_date else current
+        for _ in range(ahead):
+            last = next_month(last)
+        months = _month_range(first, last)
+        for month in months:
+            _create_partition(cursor, month)
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{legacy}"')
+        if max_id is not None:
+            cursor.execute('SELECT setval(%s, %s)', [sequence, max_id])
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+        # Added once the legacy table, which already has it since migration
+        # 0008, is dropped: the constraint's index name must be free
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{FINGERPRINT_CONSTRAINT}" UNIQUE ("fingerprint", "date")'
+        )
+        for definition in index_definitions:
+            cursor.execute(definition)
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+    return months
+
+
+def archive_partitions_before(month: Month, schema: Optional[str] = None) -> List[str]:
+    """
+    Detach every monthly partition older than `month` and move it into the
+    archive schema, where it can be dumped or dropped without touching the
+    live table. Returns the archived table names.
+    """
+    schema = schema or settings.TRANSACTION_ARCHIVE_SCHEMA
+    archived = []
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        for old_month in sorted(existing_partitions()):
+            if old_month >= month:
+                break
+            name = partition_name(old_month)
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"')
+            archived.append(f'{schema}.{name}')
+    return archived
@@ -0,0 +1,273 @@
+import json
+import logging
+import threading
+import zlib
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+from .models import PDFDocument, Transaction
+from .cache import bump_data_version
+from .dedup import account_key, fallback_account_key, filter_new_transactions
+from .partitioning import ensure_month_partitions
+from .extraction_pool import ExtractionError, get_extraction_pool
+from .ml_services.pdf_extractor import PDFExtractor, UnreadablePDF, import_pdf_libraries
+from .ml_services.transaction_parser import TransactionParser
+from .ml_services.statement_header import StatementHeaderAnalyzer
+from .ml_services.category_classifier import CategoryClassifier
+from .ml_services.merchant_normalizer import MerchantNormalizer
+from .ml_services.hashed_classifier import load_model
+
+logger = logging.getLogger(__name__)
+
+BULK_CREATE_BATCH_SIZE = 500
+PAGE_TEXT_COMPRESSION_LEVEL = 6
+
+merchant_normalizer = MerchantNormalizer()
+
+# Process-wide pipeline instances, built once and shared by request threads
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_extractor() -> PDFExtractor:
+    extractor = _shared.get('extractor')
+    if extractor is None:
+        with _shared_lock:
+            extractor = _shared.setdefault('extractor', PDFExtractor())
+    return extractor
+
+
+def get_parser() -> TransactionParser:
+    parser = _shared.get('parser')
+    if parser is None:
+        with _shared_lock:
+            parser = _shared.setdefault('parser', TransactionParser())
+    return parser
+
+
+def get_header_analyzer() -> StatementHeaderAnalyzer:
+    analyzer = _shared.get('header_analyzer')
+    if analyzer is None:
+        with _shared_lock:
+            analyzer = _shared.setdefault('header_analyzer', StatementHeaderAnalyzer())
+    return analyzer
+
+
+def get_classifier(model_path: Optional[str] = None, min_model_confidence: float = 0.6) -> CategoryClassifier:
+    """Shared classifier for a model path, rebuilt when the model file is retrained"""
+    model = load_model(model_path)
+    key = ('classifier', model_path, min_model_confidence)
+    classifier = _shared.get(key)
+    if classifier is None or classifier.model is not model:
+        with _shared_lock:
+            classifier = _shared.get(key)
+            if classifier is None or classifier.model is not model:
+                classifier = _shared[key] = CategoryClassifier(model=model, min_model_confidence=min_model_confidence)
+    return classifier
+
+
+def warm_up() -> None:
+    """
+    Build the shared pipeline instances, load the category model and start the
+    extraction workers (or import the PDF libraries when extraction runs in
+    process) so the first upload does not pay for them
+    """
+    get_extractor()
+    get_parser()
+    get_header_analyzer()
+    get_classifier(settings.CATEGORY_MODEL_PATH, settings.CATEGORY_MODEL_MIN_CONFIDENCE)
+    if settings.EXTRACTION_ISOLATED:
+        get_extraction_pool().prestart()
+    else:
+        import_pdf_libraries()
+
+
+def process_statement(file_path: str, model_path: Optional[str] = None,
+                      min_model_confidence: float = 0.6) -> Dict[str, Any]:
+    """
+    Run extraction, bank detection, parsing and classification on a PDF.
+    Touches no database state, so it is safe to run in worker processes.
+    """
+    # Extract text from PDF
+    pages = get_extractor().extract_pages(file_path)
+    return analyze_pages(pages, model_path, min_model_confidence)
+
+
+def extract_statement_pages(file_path: str) -> List[str]:
+    """
+    Extract page text in the supervised worker pool when EXTRACTION_ISOLATED
+    is set, otherwise in this process. Raises ExtractionError on failure.
+    """
+    if settings.EXTRACTION_ISOLATED:
+        return get_extraction_pool().extract_pages(file_path)
+    try:
+        return get_extractor().extract_pages(file_path)
+    except UnreadablePDF as e:
+        raise ExtractionError(str(e)) from e
+
+
+def analyze_pages(pages: List[str], model_path: Optional[str] = None,
+                  min_model_confidence: float = 0.6) -> Dict[str, Any]:
+    """
+    Read the statement header, parse and classify transactions from extracted
+    page text, and check the transactions against the header's balances
+    """
+    header_analyzer = get_header_analyzer()
+    extracted_text = ''.join(pages)
+
+    # Bank, account type, account number, period and balances from the first and last page
+    header = header_analyzer.analyze(pages)
+
+    # Parse transactions based on bank type
+    raw_transactions = get_parser().parse_transactions(extracted_text, header['bank_type'], header['opening_balance'])
+
+    # Classify categories
+    classifier = get_classifier(model_path, min_model_confidence)
+    classified_transactions = classifier.classify_transactions(raw_transactions)
+
+    return {
+        'pages': pages,
+        'page_count': len(pages),
+        'bank_type': header['bank_type'],
+        'account_type': header['account_type'],
+        'header': header,
+        'balance_check': header_analyzer.verify_transactions(header, raw_transactions),
+        'transactions': classified_transactions,
+        'parser_version': TransactionParser.VERSION,
+        'classifier_version': CategoryClassifier.VERSION
+    }
+
+
+def statement_fields(result: Dict[str, Any]) -> Dict[str, Any]:
+    """PDFDocument fields taken from the statement header of an analyze_pages result"""
+    header = result['header']
+    status = result['balance_check']['status']
+    return {
+        'bank_type': result['bank_type'],
+        'account_type': result['account_type'],
+        'account_number': header['account_number'],
+        'period_start': header['period_start'],
+        'period_end': header['period_end'],
+        'opening_balance': header['opening_balance'],
+        'closing_balance': header['closing_balance'],
+        'balances_verified': None if status == 'unavailable' else status == 'verified'
+    }
+
+
+def result_account_key(result: Dict[str, Any]) -> str:
+    """
+    Account a processed statement belongs to, for transaction fingerprints.
+    Statements of different accounts at the same bank never share rows.
+    """
+    return account_key(result['bank_type'], result['account_type'], result['header']['account_number'])
+
+
+def result_fallback_account_key(result: Dict[str, Any]) -> Optional[str]:
+    """
+    Key that rows of this account stored without an account number were
+    fingerprinted under, or None when the statement has no number either
+    """
+    return fallback_account_key(result['bank_type'], result['account_type'], result['header']['account_number'])
+
+
+def compress_pages(pages: List[str]) -> bytes:
+    """Pack extracted page text for storage on PDFDocument.page_text"""
+    return zlib.compress(json.dumps(pages).encode('utf-8'), PAGE_TEXT_COMPRESSION_LEVEL)
+
+
+def decompress_pages(page_text: bytes) -> List[str]:
+    return json.loads(zlib.decompress(bytes(page_text)).decode('utf-8'))
+
+
+def record_failed_statement(filename: str, file_size: int, error: ExtractionError) -> PDFDocument:
+    """Keep a record of a statement whose extraction failed, with the reason"""
+    document = PDFDocument.objects.create(
+        filename=filename,
+        file_size=file_size,
+        processed=False,
+        status=error.status,
+        error_message=str(error)
+    )
+    # The new document shows up in bank types
+    bump_data_version()
+    return document
+
+
+def build_transactions(document: PDFDocument, new_transactions: List[Tuple[str, Dict[str, Any]]]) -> List[Transaction]:
+    """Turn (fingerprint, parsed transaction) pairs into unsaved Transaction rows"""
+    transaction_objects = []
+    for fingerprint, transaction_data in new_transactions:
+        try:
+            transaction_objects.append(Transaction(
+                document=document,
+                date=datetime.strptime(transaction_data['date'], '%Y-%m-%d').date(),
+                description=transaction_data['description'],
+                amount=transaction_data['amount'],
+                category=transaction_data['category'],
+                transaction_type=transaction_data['type'],
+                confidence_score=transaction_data.get('confidence_score', 0.5),
+                fingerprint=fingerprint,
+                merchant=merchant_normalizer.normalize(transaction_data['description'])[:255]
+            ))
+        except Exception as e:
+            logger.warning("Skipping transaction of %s that could not be built: %s", document.filename, e)
+            continue
+    return transaction_objects
+
+
+def transaction_dates(transactions: List[Dict[str, Any]]) -> set:
+    """Distinct valid dates of parsed transactions"""
+    dates = set()
+    for transaction_data in transactions:
+        try:
+            dates.add(datetime.strptime(transaction_data['date'], '%Y-%m-%d').date())
+        except (KeyError, TypeError, ValueError):
+            continue
+    return dates
+
+
+def store_statement(filename: str, file_size: int, result: Dict[str, Any]) -> Tuple[PDFDocument, int, int]:
+    """
+    Persist a processed statement: create the PDFDocument, skip transactions
+    already stored from overlapping statements and bulk insert the rest.
+    Returns (document, transactions created, duplicates skipped).
+    """
+    # Monthly partitions (PostgreSQL only) are created before the insert transaction
+    ensure_month_partitions(transaction_dates(result['transactions']))
+
+    with db_transaction.atomic():
+        # Create PDF document record
+        document = PDFDocument.objects.create(
+            filename=filename,
+            file_size=file_size,
+            processed=True,
+            page_text=compress_pages(result['pages']),
+            parser_version=result['parser_version'],
+            classifier_version=result['classifier_version'],
+            **statement_fields(result)
+        )
+
+        # Skip transactions already stored from overlapping statements
+        new_transactions, duplicates_skipped = filter_new_transactions(
+            result_account_key(result), result['transactions'], result_fallback_account_key(result)
+        )
+
+        # Create transaction records
+        transaction_objects = build_transactions(document, new_transactions)
+        Transaction.objects.bulk_create(
+            transaction_objects, batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True
+        )
+        # ignore_conflicts drops rows a concurrent upload of the same statement
+        # stored first, so count what the new document actually holds
+        created = document.transactions.count()
+    if created < len(transaction_objects):
+        logger.warning("%d transaction(s) of %s were stored first by a concurrent upload",
+                       len(transaction_objects) - created, filename)
+
+    # Invalidate cached search results and bank types
+    bump_data_version()
+
+    return document, created, duplicates_skipped + len(transaction_objects) - created
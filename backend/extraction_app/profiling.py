@@ -0,0 +1,188 @@
+import contextvars
+import cProfile
+import functools
+import os
+import pstats
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import connection
+
+# Source path fragments used to attribute profiled time to pipeline stages
+STAGE_PATTERNS = [
+    ('extraction', ('pdf_extractor', 'extraction_pool', 'pdfplumber', 'pdfminer', 'PyPDF2', 'multiprocessing')),
+    ('parsing', ('transaction_parser', 'statement_header')),
+    ('classification', ('category_classifier', 'merchant_normalizer', 'hashed_classifier')),
+    ('orm', ('django/db', 'django\\db')),
+    ('serialization', ('serializers', 'renderers', 'orjson')),
+]
+# How far up the busiest callers to look for a stage for builtins and library
+# code such as the selectors poll the pool waits on
+MAX_CALLER_DEPTH = 8
+
+# Raw cProfile stats sent back by extraction workers during a profiled request
+_worker_stats = contextvars.ContextVar('worker_stats', default=None)
+
+
+class QueryRecorder:
+    """Connection execute wrapper counting SQL queries and their total time"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def _profile_requested(request) -> bool:
+    header = request.META.get('HTTP_X_PROFILE', '')
+    flag = request.GET.get('profile', '')
+    return header.lower() in ('1', 'true') or flag.lower() in ('1', 'true')
+
+
+def _stage_for(filename: str) -> str:
+    for stage, patterns in STAGE_PATTERNS:
+        if any(pattern in filename for pattern in patterns):
+            return stage
+    return 'other'
+
+
+def _stage_of(function: tuple, stats: Dict[tuple, tuple]) -> str:
+    """
+    Stage of a profiled function: its own file's, else the first stage found
+    along its busiest callers, so builtins and library code count towards the
+    pipeline code that called them
+    """
+    seen = set()
+    for _ in range(MAX_CALLER_DEPTH):
+        stage = _stage_for(function[0])
+        if stage != 'other' or function in seen:
+            return stage
+        seen.add(function)
+        callers = stats.get(function, (None,) * 5)[4]
+        if not callers:
+            return stage
+        function = max(callers.items(), key=lambda item: item[1][2])[0]
+    return 'other'
+
+
+def worker_profiling_requested() -> bool:
+    """Whether extraction workers should profile the document they are sent"""
+    return _worker_stats.get() is not None
+
+
+def add_worker_stats(stats: Dict[tuple, tuple]) -> None:
+    """Collect the cProfile stats an extraction worker sent back"""
+    collected = _worker_stats.get()
+    if collected is not None:
+        collected.append(stats)
+
+
+class _RawStats:
+    """Lets pstats load a stats dict received from a worker"""
+
+    def __init__(self, stats: Dict[tuple, tuple]):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def _stage_seconds(stats: pstats.Stats) -> Dict[str, float]:
+    stages = {}
+    for function, (_, _, own_time, _, _) in stats.stats.items():
+        stage = _stage_of(function, stats.stats)
+        stages[stage] = stages.get(stage, 0.0) + own_time
+    return {stage: round(seconds, 4) for stage, seconds in sorted(stages.items())}
+
+
+def _top_functions(stats: pstats.Stats, limit: int = 15) -> list:
+    functions = []
+    for (filename, line, name), (_, calls, own_time, cumulative_time, _) in stats.stats.items():
+        functions.append((cumulative_time, own_time, calls, f'{os.path.basename(filename)}:{line}({name})'))
+    functions.sort(reverse=True)
+    return [
+        {'function': label, 'calls': calls, 'own_seconds': round(own, 4), 'cumulative_seconds': round(cumulative, 4)}
+        for cumulative, own, calls, label in functions[:limit]
+    ]
+
+
+def summarize(stats: pstats.Stats, queries: QueryRecorder, wall_seconds: float,
+              worker_stats: Optional[pstats.Stats] = None) -> Dict[str, Any]:
+    """
+    Break profiled time down by pipeline stage and list the hottest functions.
+    Time spent waiting on an extraction worker counts as extraction; what the
+    worker did in that time is broken down separately from its own stats.
+    """
+    summary = {
+        'wall_seconds': round(wall_seconds, 4),
+        'sql_queries': queries.count,
+        'sql_seconds': round(queries.seconds, 4),
+        'stage_seconds': _stage_seconds(stats),
+        'top_functions': _top_functions(stats)
+    }
+    if worker_stats is not None:
+        summary['worker_stage_seconds'] = _stage_seconds(worker_stats)
+        summary['worker_top_functions'] = _top_functions(worker_stats)
+    return summary
+
+
+def profiled(view_func):
+    """
+    Profile a view when PROFILING_ENABLED is set and the request carries an
+    `X-Profile: 1` header or `?profile=1`. The cProfile output is written to
+    PROFILING_DIR and a per-stage summary is added to the response.
+    """
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not getattr(settings, 'PROFILING_ENABLED', False) or not _profile_requested(request):
+            return view_func(request, *args, **kwargs)
+
+        queries = QueryRecorder()
+        profiler = cProfile.Profile()
+        collected = []
+        token = _worker_stats.set(collected)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(queries):
+                profiler.enable()
+                try:
+                    response = view_func(request, *args, **kwargs)
+                finally:
+                    profiler.disable()
+        finally:
+            _worker_stats.reset(token)
+        wall_seconds = time.perf_counter() - start
+
+        profile_dir = settings.PROFILING_DIR
+        os.makedirs(profile_dir, exist_ok=True)
+        # Requests profiled in the same second by one process (threaded
+        # servers) get distinct files through the random suffix
+        profile_name = f'{view_func.__name__}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        profile_path = os.path.join(profile_dir, profile_name + '.prof')
+        profiler.dump_stats(profile_path)
+
+        # Extraction workers' own profiles go to a second file
+        worker_stats = worker_profile_path = None
+        if collected:
+            worker_stats = pstats.Stats(*[_RawStats(stats) for stats in collected])
+            worker_profile_path = os.path.join(profile_dir, profile_name + '-worker.prof')
+            worker_stats.dump_stats(worker_profile_path)
+
+        summary = summarize(pstats.Stats(profiler), queries, wall_seconds, worker_stats)
+        summary['profile_file'] = profile_path
+        if worker_profile_path:
+            summary['worker_profile_file'] = worker_profile_path
+        if isinstance(getattr(response, 'data', None), dict):
+            response.data['profile'] = summary
+        return response
+
+    return wrapper
@@ -0,0 +1,137 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q, QuerySet
+
+from .models import PDFDocument, Transaction
+from .cache import bump_data_version
+from .dedup import fingerprint_transactions, existing_fingerprints
+from .partitioning import ensure_month_partitions
+from .pipeline import (
+    analyze_pages, decompress_pages, build_transactions, statement_fields, result_account_key,
+    result_fallback_account_key, BULK_CREATE_BATCH_SIZE
+)
+from .ml_services.transaction_parser import TransactionParser
+from .ml_services.category_classifier import CategoryClassifier
+
+
+def stale_documents() -> QuerySet:
+    """Documents with stored page text that an older parser or classifier produced"""
+    return PDFDocument.objects.filter(page_text__isnull=False).filter(
+        ~Q(parser_version=TransactionParser.VERSION) | ~Q(classifier_version=CategoryClassifier.VERSION)
+    )
+
+
+def _reanalyze(page_text: bytes, model_path: Optional[str], min_model_confidence: float) -> Dict[str, Any]:
+    """Worker entry point: re-parse stored page text without opening the PDF"""
+    return analyze_pages(decompress_pages(page_text), model_path, min_model_confidence)
+
+
+def apply_result(document: PDFDocument, result: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Reconcile a document's stored transactions with a fresh parse. Rows whose
+    fingerprint and classification are unchanged are left untouched.
+    """
+    fingerprints = fingerprint_transactions(result_account_key(result), result['transactions'])
+    parsed = dict(zip(fingerprints, result['transactions']))
+    # Rows stored before the document's account number was read are keyed
+    # without it; they are matched under that key and re-keyed
+    fallback_account = result_fallback_account_key(result)
+    fallback = fingerprint_transactions(fallback_account, result['transactions']) if fallback_account else None
+    rekeyed = dict(zip(fallback, fingerprints)) if fallback and not document.account_number else {}
+    stored = {}
+    to_delete = []
+    to_update = {}
+    for row in document.transactions.all():
+        # Legacy rows without a fingerprint are replaced by the fresh parse
+        if row.fingerprint is None:
+            to_delete.append(row.id)
+            continue
+        if row.fingerprint in rekeyed:
+            row.fingerprint = rekeyed[row.fingerprint]
+            to_update[row.id] = row
+        stored[row.fingerprint] = row
+
+    to_delete += [row.id for fingerprint, row in stored.items() if fingerprint not in parsed]
+    for fingerprint, row in stored.items():
+        transaction_data = parsed.get(fingerprint)
+        if transaction_data is None:
+            continue
+        category = transaction_data['category']
+        confidence = round(float(transaction_data.get('confidence_score', 0.5)), 2)
+        transaction_type = transaction_data['type']
+        if (row.category, float(row.confidence_score), row.transaction_type) != (category, confidence, transaction_type):
+            row.category = category
+            row.confidence_score = confidence
+            row.transaction_type = transaction_type
+            to_update[row.id] = row
+
+    # New rows may already exist under another, overlapping document
+    candidates = [fingerprint for fingerprint in parsed if fingerprint not in stored]
+    candidate_fallback = None
+    if fallback:
+        fallback_of = dict(zip(fingerprints, fallback))
+        candidate_fallback = [fallback_of[fingerprint] for fingerprint in candidates]
+    already_stored = existing_fingerprints(candidates, candidate_fallback)
+    to_create = build_transactions(document, [
+        (fingerprint, parsed[fingerprint]) for fingerprint in candidates if fingerprint not in already_stored
+    ])
+
+    ensure_month_partitions(row.date for row in to_create)
+    with db_transaction.atomic():
+        Transaction.objects.filter(id__in=to_delete).delete()
+        Transaction.objects.bulk_update(
+            to_update.values(), ['fingerprint', 'category', 'confidence_score', 'transaction_type'],
+            batch_size=BULK_CREATE_BATCH_SIZE
+        )
+        Transaction.objects.bulk_create(to_create, batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True)
+        fields = statement_fields(result)
+        for name, value in fields.items():
+            setattr(document, name, value)
+        document.parser_version = result['parser_version']
+        document.classifier_version = result['classifier_version']
+        document.save(update_fields=[*fields, 'parser_version', 'classifier_version'])
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'unchanged': len(parsed) - len(to_update) - len(candidates)
+    }
+
+
+def reprocess_documents(documents: Iterable[PDFDocument], workers: int = 1,
+                        chunk_size: int = 64) -> List[Dict[str, Any]]:
+    """
+    Re-parse and reclassify documents from their stored page text, in a
+    process pool when workers > 1, applying each diff as results arrive
+    """
+    arguments = (settings.CATEGORY_MODEL_PATH, settings.CATEGORY_MODEL_MIN_CONFIDENCE)
+    documents = iter(documents)
+    reports = []
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    try:
+        while True:
+            # Only hold a chunk of compressed page text in memory at a time
+            chunk = list(islice(documents, chunk_size))
+            if not chunk:
+                break
+            chunk = [document for document in chunk if document.page_text is not None]
+            page_texts = [bytes(document.page_text) for document in chunk]
+            if executor is not None:
+                results = executor.map(_reanalyze, page_texts, *[[argument] * len(chunk) for argument in arguments])
+            else:
+                results = (_reanalyze(page_text, *arguments) for page_text in page_texts)
+            for document, result in zip(chunk, results):
+                reports.append({'document_id': document.id, **apply_result(document, result)})
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if any(report['created'] or report['updated'] or report['deleted'] for report in reports):
+        bump_data_version()
+    return reports
@@ -11,4 +11,22 @@ class PDFDocumentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = PDFDocument
-        fields = ['id', 'filename', 'uploaded_at', 'file_size', 'processed', 'transactions']
\ No newline at end of file
+        fields = ['id', 'filename', 'uploaded_at', 'file_size', 'processed', 'transactions']
+
+def serialize_transaction_rows(queryset) -> list:
+    """
+    Fast read path equivalent to TransactionSerializer(many=True): builds rows
+    straight from values_list() tuples without per-field serializer overhead
+    """
+    rows = queryset.values_list(*TransactionSerializer.Meta.fields)
+    return [
+        {
+            'id': id,
+            'date': date.isoformat(),
+            'description': description,
+            'amount': format(amount, 'f'),
+            'category': category,
+            'transaction_type': transaction_type,
+        }
+        for id, date, description, amount, category, transaction_type in rows
+    ]
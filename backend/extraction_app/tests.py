@@ -0,0 +1,648 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import chunked_upload
+from .dedup import fingerprint_transactions
+from .extraction_pool import ExtractionError, ExtractionPool
+from .middleware import CompressionMiddleware
+from .models import PDFDocument, Transaction, UploadSession
+from .pipeline import build_transactions, record_failed_statement, store_statement
+from .reprocess import apply_result, reprocess_documents, stale_documents
+from .transaction_io import iter_json_records, iter_ndjson_records
+from .ml_services.category_classifier import CategoryClassifier
+from .ml_services.hashed_classifier import HashedNgramClassifier, load_model
+from .ml_services.merchant_normalizer import MerchantCache
+from .ml_services.pdf_extractor import PDFExtractor, PageBudgetExceeded, UnreadablePDF
+from .ml_services.statement_header import StatementHeaderAnalyzer
+from .ml_services.transaction_parser import TransactionParser
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+CORRUPT_PDF = b'%PDF-1.4\nthis is not a pdf\n'
+
+
+class MediaRootMixin:
+    """Run each test against an empty MEDIA_ROOT in a temporary directory"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root, CHUNKED_UPLOAD_DIR=os.path.join(media_root, 'chunked'))
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.media_root = media_root
+
+
+def _debit(description, amount=-1500.0):
+    return {'date': '2025-03-03', 'description': description, 'amount': amount, 'type': 'debit'}
+
+
+class CategoryClassifierTests(SimpleTestCase):
+    def setUp(self):
+        self.classifier = CategoryClassifier(cache=MerchantCache(), model=None)
+
+    def classify(self, description, **kwargs):
+        transaction = self.classifier.classify_transactions([_debit(description, **kwargs)])[0]
+        return transaction['category'], transaction['confidence_score']
+
+    def test_keywords_inside_reference_tokens_match(self):
+        self.assertEqual(self.classify('CHQDEP-TRANSFEROW1-MODELCOLONY-P 0000000000001265'), ('transfer', 0.9))
+        self.assertEqual(self.classify('MSEDCL12345 BILL'), ('bills', 0.9))
+        self.assertEqual(self.classify('HOTEL123456789'), ('food', 0.9))
+        self.assertEqual(self.classify('ATM WDL PHARMACY2024'), ('healthcare', 0.9))
+
+    def test_memo_is_shared_only_by_descriptions_with_the_same_words(self):
+        self.assertEqual(self.classify('UPI/412345678901/SWIGGY'), ('transfer', 0.9))
+        self.assertEqual(self.classify('UPI/498765432109/SWIGGY'), ('transfer', 0.9))
+        self.assertEqual(self.classifier.cache_stats()['hits'], 1)
+
+        self.assertEqual(self.classify('HOTEL123456789'), ('food', 0.9))
+        self.assertEqual(self.classify('123456789', amount=-5000.0), ('other', 0.7))
+
+
+HDFC_ROWS = """Date Narration Chq./Ref.No. ValueDt WithdrawalAmt. DepositAmt. ClosingBalance
+01/03/25 NEFTCR-CITI0100000-INDIAIDEAS.COMLIMIT CITIN52025030129 01/03/25 12,888.00 1,386,900.83
+ED-PAESCROW-BOLEGASAGENCY-CITIN52025 154590
+01/03/25 | NEFTCR-CITI0100000-INDIAIDEAS.COMLIMIT | 12,888.00 | 1,386,900.83
+01/03/25 RTGSDR-SBIN0009995-BHARATPETROLEUMCOR HDFCR52025030195 01/03/25 600,000.00 786,900.83
+03/03/25 CASHDEPOSITBY-SELF-KOREGAONPARK 000000000000000 03/03/25 3,400.00 790,300.83
+"""
+
+
+class HdfcParserTests(SimpleTestCase):
+    def test_amounts_are_signed_by_the_running_balance(self):
+        transactions = TransactionParser().parse_transactions(HDFC_ROWS, 'hdfc', 1374012.83)
+        self.assertEqual(
+            [(t['date'], t['amount'], t['type']) for t in transactions],
+            [('2025-03-01', 12888.0, 'credit'), ('2025-03-01', -600000.0, 'debit'), ('2025-03-03', 3400.0, 'credit')]
+        )
+        self.assertEqual(transactions[0]['description'], 'NEFTCR-CITI0100000-INDIAIDEAS.COMLIMIT')
+
+
+class _Page:
+    def __init__(self, text, late_alarm=False):
+        self.text = text
+        self.late_alarm = late_alarm
+
+    def extract_tables(self):
+        return []
+
+    def extract_text(self):
+        return self.text
+
+    def flush_cache(self):
+        # The budget alarm landing after the page was extracted
+        if self.late_alarm:
+            raise PageBudgetExceeded()
+
+
+class PageBudgetTests(SimpleTestCase):
+    def test_late_alarm_skips_only_its_page(self):
+        pdf = mock.MagicMock()
+        pdf.__enter__.return_value.pages = [_Page('one'), _Page('two', late_alarm=True), _Page('three')]
+        extractor = PDFExtractor()
+        with mock.patch('pdfplumber.open', return_value=pdf):
+            pages = extractor.extract_pages('statement.pdf', page_budget=30)
+        self.assertEqual(pages, ['one\n', '', 'three\n'])
+        self.assertEqual(extractor.skipped_pages, 1)
+
+
+def _row(description='SMS CHARGES', amount=-17.7, date='2025-03-31', category='bills'):
+    return {'date': date, 'description': description, 'amount': amount,
+            'type': 'debit' if amount < 0 else 'credit', 'category': category, 'confidence_score': 0.9}
+
+
+def _statement(transactions, account_number='', bank_type='hdfc', account_type='savings'):
+    """An analyze_pages result for parsed transactions"""
+    return {
+        'pages': [''],
+        'page_count': 1,
+        'bank_type': bank_type,
+        'account_type': account_type,
+        'header': {'account_number': account_number, 'period_start': None, 'period_end': None,
+                   'opening_balance': None, 'closing_balance': None},
+        'balance_check': {'status': 'unavailable'},
+        'transactions': transactions,
+        'parser_version': TransactionParser.VERSION,
+        'classifier_version': CategoryClassifier.VERSION,
+    }
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AccountFingerprintTests(TestCase):
+    def test_same_row_in_two_accounts_is_kept(self):
+        _, created, skipped = store_statement('a.pdf', 1, _statement([_row()], account_number='50100011112222'))
+        self.assertEqual((created, skipped), (1, 0))
+        _, created, skipped = store_statement('b.pdf', 1, _statement([_row()], account_number='50100033334444'))
+        self.assertEqual((created, skipped), (1, 0))
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_rows_stored_without_an_account_number_still_count_as_duplicates(self):
+        store_statement('imported', 0, _statement([_row(), _row('INTEREST', 12.5)]))
+        _, created, skipped = store_statement('a.pdf', 1, _statement(
+            [_row(), _row('INTEREST', 12.5), _row('NEFT RENT', -15000.0)], account_number='50100011112222'
+        ))
+        self.assertEqual((created, skipped), (1, 2))
+
+    def test_rows_of_a_numbered_statement_do_not_hide_another_accounts_rows(self):
+        store_statement('a.pdf', 1, _statement([_row()], account_number='50100011112222'))
+        _, created, _ = store_statement('unnumbered.pdf', 1, _statement([_row()]))
+        self.assertEqual(created, 1)
+
+    def test_reprocessing_rekeys_rows_stored_before_the_number_was_read(self):
+        document, _, _ = store_statement('a.pdf', 1, _statement([_row(), _row('INTEREST', 12.5)]))
+        ids = sorted(document.transactions.values_list('id', flat=True))
+
+        report = apply_result(document, _statement([_row(), _row('INTEREST', 12.5)], account_number='50100011112222'))
+        self.assertEqual((report['created'], report['deleted'], report['updated']), (0, 0, 2))
+        self.assertEqual(sorted(document.transactions.values_list('id', flat=True)), ids)
+        self.assertEqual(PDFDocument.objects.get(id=document.id).account_number, '50100011112222')
+
+        # The re-keyed rows now deduplicate statements of the same account only
+        _, created, skipped = store_statement('b.pdf', 1, _statement([_row()], account_number='50100011112222'))
+        self.assertEqual((created, skipped), (0, 1))
+        _, created, skipped = store_statement('c.pdf', 1, _statement([_row()], account_number='50100033334444'))
+        self.assertEqual((created, skipped), (1, 0))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DeduplicationTests(TestCase):
+    def test_repeats_within_a_statement_are_numbered(self):
+        rows = [_row('ATM WDL', -500.0), _row('ATM WDL', -500.0)]
+        fingerprints = fingerprint_transactions('hdfc:savings:1', rows)
+        self.assertNotEqual(fingerprints[0], fingerprints[1])
+        # Numbering carries across batches of one statement
+        seen = {}
+        batches = [fingerprint_transactions('hdfc:savings:1', batch, seen) for batch in (rows[:1], rows[1:])]
+        self.assertEqual(batches[0] + batches[1], fingerprints)
+
+        _, created, skipped = store_statement('a.pdf', 1, _statement(rows, account_number='1'))
+        self.assertEqual((created, skipped), (2, 0))
+        # A third identical withdrawal in a longer statement is new
+        _, created, skipped = store_statement('b.pdf', 1, _statement(rows + [_row('ATM WDL', -500.0)], account_number='1'))
+        self.assertEqual((created, skipped), (1, 2))
+
+    def test_reupload_stores_nothing(self):
+        rows = [_row(), _row('INTEREST', 12.5, '2025-03-30'), _row('NEFT RENT', -15000.0, '2025-03-05')]
+        store_statement('a.pdf', 1, _statement(rows, account_number='1'))
+        _, created, skipped = store_statement('a.pdf', 1, _statement(rows, account_number='1'))
+        self.assertEqual((created, skipped), (0, 3))
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_overlapping_statements_store_each_row_once(self):
+        march = [_row('NEFT RENT', -15000.0, '2025-03-05'), _row()]
+        quarter = [_row('NEFT RENT', -15000.0, '2025-01-05'), _row('NEFT RENT', -15000.0, '2025-02-05'), *march]
+        store_statement('march.pdf', 1, _statement(march, account_number='1'))
+        document, created, skipped = store_statement('q1.pdf', 1, _statement(quarter, account_number='1'))
+        self.assertEqual((created, skipped), (2, 2))
+        self.assertEqual(
+            sorted(str(date) for date in document.transactions.values_list('date', flat=True)),
+            ['2025-01-05', '2025-02-05']
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES, EXTRACTION_ISOLATED=False)
+class CorruptPDFTests(MediaRootMixin, TestCase):
+    def write_corrupt_pdf(self):
+        path = os.path.join(self.media_root, 'corrupt.pdf')
+        with open(path, 'wb') as corrupt_file:
+            corrupt_file.write(CORRUPT_PDF)
+        return path
+
+    def test_extractor_raises_when_no_library_can_read_the_file(self):
+        with self.assertLogs('extraction_app.ml_services.pdf_extractor', 'ERROR'):
+            with self.assertRaises(UnreadablePDF):
+                PDFExtractor().extract_pages(self.write_corrupt_pdf())
+
+    def test_worker_reports_an_extraction_error(self):
+        pool = ExtractionPool(workers=1, timeout=60)
+        self.addCleanup(pool.shutdown)
+        with self.assertRaises(ExtractionError) as raised:
+            pool.extract_pages(self.write_corrupt_pdf())
+        self.assertEqual(raised.exception.status, 'failed')
+
+    def test_upload_records_a_failed_statement(self):
+        with self.assertLogs('extraction_app.ml_services.pdf_extractor', 'ERROR'):
+            response = self.client.post('/api/upload-pdf/', {
+                'file': SimpleUploadedFile('corrupt.pdf', CORRUPT_PDF, content_type='application/pdf')
+            })
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()['status'], 'failed')
+        document = PDFDocument.objects.get(id=response.json()['document_id'])
+        self.assertEqual((document.status, document.processed), ('failed', False))
+        self.assertFalse(os.listdir(self.media_root))
+
+
+class ModelFileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'category_model.npy')
+
+    def model(self, value):
+        return HashedNgramClassifier(['food', 'other'], n_features=16,
+                                     weights=np.full((17, 2), value, dtype=np.float32))
+
+    def test_retraining_leaves_mapped_weights_intact(self):
+        self.model(1.0).save(self.path)
+        loaded = load_model(self.path)
+        self.model(2.0).save(self.path)
+
+        self.assertEqual(float(loaded.weights[3, 1]), 1.0)
+        reloaded = load_model(self.path)
+        self.assertIsNot(reloaded, loaded)
+        self.assertEqual(float(reloaded.weights[3, 1]), 2.0)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))), ['category_model.json', 'category_model.npy'])
+
+    def test_weights_without_their_sidecar_are_not_loaded(self):
+        self.model(1.0).save(self.path)
+        loaded = load_model(self.path)
+        # New weights renamed into place before their sidecar, as by a save in another process
+        temporary_path = self.path + '.new.npy'
+        np.save(temporary_path, np.full((17, 2), 2.0, dtype=np.float32))
+        os.replace(temporary_path, self.path)
+
+        self.assertIs(load_model(self.path), loaded)
+        self.model(2.0).save(self.path)
+        self.assertEqual(float(load_model(self.path).weights[0, 0]), 2.0)
+
+    def test_path_must_end_in_npy(self):
+        with self.assertRaises(ValueError):
+            self.model(1.0).save(self.path[:-len('.npy')])
+
+
+SAMPLE_PDF = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'sample_pdfs', 'hdfc-demo.pdf')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IngestStatementsTests(TestCase):
+    def test_unreadable_file_fails_alone(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shutil.copy(SAMPLE_PDF, os.path.join(directory, 'statement.pdf'))
+        with open(os.path.join(directory, 'corrupt.pdf'), 'wb') as corrupt_file:
+            corrupt_file.write(CORRUPT_PDF)
+        checkpoint_path = os.path.join(directory, 'checkpoint.json')
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('ingest_statements', directory, checkpoint=checkpoint_path, workers=1,
+                     stdout=stdout, stderr=stderr)
+
+        self.assertIn('1 failed', stdout.getvalue())
+        self.assertIn('FAILED corrupt.pdf', stderr.getvalue())
+        with open(checkpoint_path) as checkpoint_file:
+            self.assertEqual(list(json.load(checkpoint_file)), ['statement.pdf'])
+        self.assertTrue(PDFDocument.objects.filter(filename='statement.pdf', processed=True).exists())
+
+
+NESTED_DOCUMENT = r'''
+{"statements": [
+  {"bank_type": "hdfc", "transactions": [
+    {"date": "2025-03-31", "description": "SMS \"CHARGES\" C:\\BANK\\", "amount": -17.75},
+    {"date": "2025-04-01", "description": "CAF\u00c9 \ud83d\ude00 ₹ SHOP", "amount": 123456.789,
+     "meta": {"tags": [1, 2]}},
+    {"date": "2025-04-02", "description": "[{not nested}]", "amount": 1e3}
+  ]}
+], "count": 3}
+'''
+
+
+class TransactionStreamTests(SimpleTestCase):
+    def records(self, text, read_size):
+        return list(iter_json_records(io.StringIO(text), read_size=read_size))
+
+    def test_records_survive_any_read_size(self):
+        expected = [
+            {'date': '2025-03-31', 'description': 'SMS "CHARGES" C:\\BANK\\', 'amount': -17.75},
+            {'date': '2025-04-01', 'description': 'CAF\u00c9 \U0001F600 \u20b9 SHOP', 'amount': 123456.789},
+            {'date': '2025-04-02', 'description': '[{not nested}]', 'amount': 1000.0},
+        ]
+        for read_size in range(1, 8):
+            with self.subTest(read_size=read_size):
+                self.assertEqual(self.records(NESTED_DOCUMENT, read_size), expected)
+
+    def test_top_level_arrays(self):
+        for read_size in range(1, 8):
+            with self.subTest(read_size=read_size):
+                self.assertEqual(self.records(' [ ] ', read_size), [])
+                self.assertEqual(
+                    self.records('[{"a": 1}, {"b": [{"c": 22}, {"d": -0.5}]}]', read_size),
+                    [{'a': 1}, {'c': 22}, {'d': -0.5}]
+                )
+
+    def test_malformed_input_raises(self):
+        for text in ('{"transactions": [{"date": "2025-03-31", "amount": 1',
+                     '{"transactions": [{"date": "2025-03-31"} {"date": "2025-04-01"}]}',
+                     '{"transactions" [{"amount": 1}]}',
+                     '{1: [{"amount": 1}]}',
+                     '[{"description": "unterminated}]'):
+            for read_size in (1, 3, 7):
+                with self.subTest(text=text, read_size=read_size):
+                    with self.assertRaises(ValueError):
+                        self.records(text, read_size)
+
+    def test_ndjson_skips_blank_lines(self):
+        stream = io.StringIO('{"amount": 1}\n\n   \n{"amount": 2, "description": "\\u00e9"}\n\n')
+        self.assertEqual(list(iter_ndjson_records(stream)), [{'amount': 1}, {'amount': 2, 'description': '\u00e9'}])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TransactionFixturesTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.directory = directory
+
+    def run_command(self, *args, **options):
+        stdout = io.StringIO()
+        call_command('transaction_fixtures', *args, stdout=stdout, stderr=io.StringIO(), **options)
+        return stdout.getvalue()
+
+    def export(self, name):
+        path = os.path.join(self.directory, name)
+        self.run_command('export', path)
+        if path.endswith('.gz'):
+            with gzip.open(path, 'rt', encoding='utf-8') as stream:
+                return path, list(iter_ndjson_records(stream))
+        with open(path, encoding='utf-8') as stream:
+            return path, list(iter_json_records(stream))
+
+    def test_export_and_import_round_trip(self):
+        store_statement('a.pdf', 1, _statement([
+            _row(), _row(), _row('CAF\u00c9 "QUOTED" \\ PATH', 1234.56, '2025-04-01', 'food'),
+        ], account_number='50100011112222'))
+        store_statement('b.pdf', 1, _statement([_row('NEFT RENT', -15000.0, '2025-04-02', 'transfer')]))
+
+        for name in ('export.json', 'export.ndjson.gz'):
+            with self.subTest(name=name):
+                path, exported = self.export('before-' + name)
+                self.assertEqual(len(exported), 4)
+                Transaction.objects.all().delete()
+                PDFDocument.objects.all().delete()
+
+                self.assertIn('Imported 4 transaction(s) into 2 document(s)', self.run_command('import', path))
+                self.assertEqual(self.export('after-' + name)[1], exported)
+
+                output = self.run_command('import', path)
+                self.assertIn('Imported 0 transaction(s)', output)
+                self.assertIn('4 duplicates skipped', output)
+                self.assertEqual(Transaction.objects.count(), 4)
+
+    def test_malformed_input_is_a_command_error(self):
+        for name, text in (('truncated.json', '{"transactions": [{"date": "2025-03-31", "amount": -1'),
+                           ('broken.ndjson', '{"date": "2025-03-31", "description": "A", "amount": -1}\n{"date"\n')):
+            path = os.path.join(self.directory, name)
+            with open(path, 'w', encoding='utf-8') as input_file:
+                input_file.write(text)
+            with self.subTest(name=name):
+                with self.assertRaises(CommandError):
+                    self.run_command('import', path)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, EXTRACTION_ISOLATED=False)
+class ChunkedUploadTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        with open(SAMPLE_PDF, 'rb') as sample_file:
+            self.data = sample_file.read()
+
+    def start(self, data):
+        response = self.client.post('/api/uploads/', {'filename': 'statement.pdf', 'total_size': len(data)})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['upload_id']
+
+    def put_chunk(self, upload_id, offset, chunk):
+        return self.client.put(f'/api/uploads/{upload_id}/chunk/?offset={offset}', chunk,
+                               content_type='application/octet-stream')
+
+    def complete(self, upload_id, data):
+        return self.client.post(f'/api/uploads/{upload_id}/complete/',
+                                {'sha256': hashlib.sha256(data).hexdigest()})
+
+    def test_resumed_upload_is_extracted(self):
+        upload_id = self.start(self.data)
+        half = len(self.data) // 2
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data[:half]).json()['received_bytes'], half)
+        # A resume served by another process has no running digest to continue
+        chunked_upload._hashers.clear()
+        status = self.client.get(f'/api/uploads/{upload_id}/').json()
+        self.assertEqual(status['received_bytes'], half)
+        self.assertEqual(self.put_chunk(upload_id, half, self.data[half:]).json()['received_bytes'], len(self.data))
+
+        response = self.complete(upload_id, self.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sha256'], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(UploadSession.objects.get(id=upload_id).status, 'completed')
+
+        self.assertEqual(self.complete(upload_id, self.data).status_code, 404)
+        self.assertEqual(self.put_chunk(upload_id, len(self.data), b'x').status_code, 404)
+
+    def test_chunk_at_the_wrong_offset_is_rejected(self):
+        upload_id = self.start(self.data)
+        self.put_chunk(upload_id, 0, self.data[:100])
+        for offset in (0, 50, 200):
+            with self.subTest(offset=offset):
+                response = self.put_chunk(upload_id, offset, self.data[offset:offset + 100])
+                self.assertEqual(response.status_code, 409)
+                self.assertEqual(response.json()['received_bytes'], 100)
+        with open(chunked_upload.part_path(UploadSession.objects.get(id=upload_id)), 'rb') as part_file:
+            self.assertEqual(part_file.read(), self.data[:100])
+
+    def test_checksum_mismatch_fails_the_upload(self):
+        upload_id = self.start(self.data)
+        self.put_chunk(upload_id, 0, self.data)
+        response = self.complete(upload_id, self.data + b'x')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['sha256'], hashlib.sha256(self.data).hexdigest())
+        session = UploadSession.objects.get(id=upload_id)
+        self.assertEqual(session.status, 'failed')
+        self.assertFalse(os.path.exists(chunked_upload.part_path(session)))
+
+    def test_expire_uploads_fails_idle_sessions(self):
+        idle_id, active_id = self.start(self.data), self.start(self.data)
+        self.put_chunk(idle_id, 0, self.data[:100])
+        self.put_chunk(active_id, 0, self.data[:100])
+        UploadSession.objects.filter(id=idle_id).update(updated_at=timezone.now() - timedelta(hours=2))
+
+        stdout = io.StringIO()
+        call_command('expire_uploads', ttl=3600, stdout=stdout)
+        self.assertIn('Expired 1 upload(s)', stdout.getvalue())
+        idle, active = UploadSession.objects.get(id=idle_id), UploadSession.objects.get(id=active_id)
+        self.assertEqual((idle.status, active.status), ('failed', 'open'))
+        self.assertFalse(os.path.exists(chunked_upload.part_path(idle)))
+        self.assertTrue(os.path.exists(chunked_upload.part_path(active)))
+        self.assertEqual(self.put_chunk(idle_id, 100, self.data[100:200]).status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_failed_statement_invalidates_bank_types(self):
+        self.assertEqual(self.client.get('/api/bank-types/').json()['bank_types'], [])
+        record_failed_statement('corrupt.pdf', 10, ExtractionError('Could not read PDF'))
+        self.assertEqual(self.client.get('/api/bank-types/').json()['bank_types'], ['unknown'])
+
+    def test_stored_statement_invalidates_analytics(self):
+        store_statement('a.pdf', 1, _statement([_row()]))
+        before = self.client.get('/api/analytics/').json()
+        store_statement('b.pdf', 1, _statement([_row('NEFT SALARY', 50000.0, '2025-04-01', 'income')]))
+        self.assertNotEqual(self.client.get('/api/analytics/').json(), before)
+        self.assertEqual(self.client.get('/api/bank-types/').json()['bank_types'], ['hdfc'])
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def encoding(self, accept_encoding):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(b'{"rows": [1, 2, 3]}' * 500))
+        request = RequestFactory().get('/api/analytics/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        response = middleware(request)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        return response.get('Content-Encoding', 'identity')
+
+    def test_highest_quality_encoding_wins(self):
+        for accept_encoding, expected in (
+            ('br', 'br'),
+            ('gzip', 'gzip'),
+            ('gzip, br', 'br'),
+            ('gzip, br;q=0.5', 'gzip'),
+            ('gzip;q=0.5, br;q=0.8', 'br'),
+            ('GZIP ; Q=0.9 , br ; q=0.1', 'gzip'),
+            ('*', 'br'),
+            ('*;q=0.5, gzip', 'gzip'),
+            ('identity', 'identity'),
+            ('gzip;q=0.4, identity;q=0.5', 'identity'),
+            ('', 'identity'),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(self.encoding(accept_encoding), expected)
+
+    def test_zero_quality_is_refused(self):
+        for accept_encoding, expected in (
+            ('br;q=0, gzip', 'gzip'),
+            ('br;q=0.0, gzip;q=0.3', 'gzip'),
+            ('br;q=0, gzip;q=0', 'identity'),
+            ('*;q=0, gzip;q=0.2', 'gzip'),
+            ('identity;q=0, gzip;q=0', 'identity'),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(self.encoding(accept_encoding), expected)
+
+    def test_brotli_is_skipped_when_not_installed(self):
+        with mock.patch('extraction_app.middleware.brotli', None):
+            self.assertEqual(self.encoding('br'), 'identity')
+            self.assertEqual(self.encoding('br, gzip;q=0.1'), 'gzip')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReprocessTests(TestCase):
+    def test_stale_document_is_reconciled_in_place(self):
+        kept, reclassified, dropped = _row(), _row('UPI SWIGGY', -450.0, category='other'), _row('REVERSED', -10.0)
+        document, _, _ = store_statement('a.pdf', 1, _statement([kept, reclassified, dropped]))
+        PDFDocument.objects.filter(id=document.id).update(parser_version=TransactionParser.VERSION - 1)
+        ids = dict(document.transactions.values_list('description', 'id'))
+
+        result = _statement([kept, {**reclassified, 'category': 'food', 'confidence_score': 0.95},
+                             _row('NEFT SALARY', 50000.0, '2025-04-01', 'income')])
+        self.assertEqual(list(stale_documents()), [document])
+        with mock.patch('extraction_app.reprocess.analyze_pages', return_value=result) as analyze:
+            reports = reprocess_documents(stale_documents())
+
+        self.assertEqual(analyze.call_args[0][0], [''])
+        self.assertEqual(reports, [{'document_id': document.id, 'created': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1}])
+        rows = {row.description: row for row in document.transactions.all()}
+        self.assertEqual(sorted(rows), ['NEFT SALARY', 'SMS CHARGES', 'UPI SWIGGY'])
+        self.assertEqual(rows['SMS CHARGES'].id, ids['SMS CHARGES'])
+        self.assertEqual(rows['UPI SWIGGY'].id, ids['UPI SWIGGY'])
+        self.assertEqual((rows['UPI SWIGGY'].category, float(rows['UPI SWIGGY'].confidence_score)), ('food', 0.95))
+        self.assertFalse(stale_documents().exists())
+
+        # Reprocessing an up-to-date parse changes nothing
+        with mock.patch('extraction_app.reprocess.analyze_pages', return_value=result):
+            reports = reprocess_documents([PDFDocument.objects.get(id=document.id)])
+        self.assertEqual(reports, [{'document_id': document.id, 'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 3}])
+
+
+@override_settings(CACHES=LOCMEM_CACHES, PROFILING_ENABLED=True)
+class ProfilingTests(TestCase):
+    def test_profiles_in_the_same_second_get_their_own_files(self):
+        profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profile_dir, ignore_errors=True)
+        with override_settings(PROFILING_DIR=profile_dir), mock.patch('time.strftime', return_value='20250331-120000'):
+            paths = [self.client.get('/api/analytics/?profile=1').json()['profile']['profile_file'] for _ in range(3)]
+        self.assertEqual(len(set(paths)), 3)
+        self.assertEqual(sorted(os.listdir(profile_dir)), sorted(os.path.basename(path) for path in paths))
+
+
+HEADER_PAGE = '''HDFC BANK LIMITED
+Account No : 50100123456789        Account Type : SAVINGS
+IFSC : HDFC0001234
+Statement From : 01/03/25 To : 31-Mar-2025
+Opening Balance : 1,000.00
+'''
+SUMMARY_PAGE = '''STATEMENT SUMMARY
+Opening Balance Dr Count Cr Count Debits Credits Closing Bal
+1,000.00 1 1 17.70 8,500.00 9,482.30
+'''
+
+
+class StatementHeaderTests(SimpleTestCase):
+    def setUp(self):
+        self.analyzer = StatementHeaderAnalyzer()
+        self.transactions = [_row(), _row('NEFT SALARY', 8500.0, category='income')]
+
+    def test_header_fields(self):
+        header = self.analyzer.analyze([HEADER_PAGE, '', 'Closing Balance : 9,482.30 Cr\n'])
+        self.assertEqual(header, {
+            'bank_type': 'hdfc', 'account_type': 'savings', 'account_number': '50100123456789',
+            'period_start': '2025-03-01', 'period_end': '2025-03-31',
+            'opening_balance': 1000.0, 'closing_balance': 9482.3, 'total_debits': None, 'total_credits': None,
+        })
+
+    def test_verified(self):
+        header = self.analyzer.analyze([HEADER_PAGE, SUMMARY_PAGE])
+        check = self.analyzer.verify_transactions(header, self.transactions)
+        self.assertEqual(check['status'], 'verified')
+        self.assertEqual((check['expected_net'], check['parsed_debits'], check['parsed_credits']), (8482.3, 17.7, 8500.0))
+
+    def test_mismatch(self):
+        header = self.analyzer.analyze([HEADER_PAGE, SUMMARY_PAGE])
+        check = self.analyzer.verify_transactions(header, self.transactions[1:])
+        self.assertEqual(check['status'], 'mismatch')
+        self.assertEqual((check['parsed_net'], check['parsed_debits']), (8500.0, 0))
+
+        # An overdrawn (Dr) closing balance is negative
+        header = self.analyzer.analyze([HEADER_PAGE, 'Closing Balance : 9,482.30 Dr'])
+        self.assertEqual(header['closing_balance'], -9482.3)
+        self.assertEqual(self.analyzer.verify_transactions(header, self.transactions)['status'], 'mismatch')
+
+    def test_unavailable_without_balances(self):
+        header = self.analyzer.analyze(['HDFC BANK LIMITED\nAccount No : 50100123456789\n'])
+        self.assertEqual((header['opening_balance'], header['closing_balance']), (None, None))
+        check = self.analyzer.verify_transactions(header, self.transactions)
+        self.assertEqual(check, {'status': 'unavailable', 'parsed_net': 8482.3})
+
+
+class BuildTransactionsTests(SimpleTestCase):
+    def test_unbuildable_rows_are_logged_and_skipped(self):
+        document = PDFDocument(filename='a.pdf')
+        with self.assertLogs('extraction_app.pipeline', 'WARNING') as logs:
+            rows = build_transactions(document, [('a' * 64, _row()), ('b' * 64, _row(date='31/03/2025'))])
+        self.assertEqual([row.fingerprint for row in rows], ['a' * 64])
+        self.assertIn('a.pdf', logs.output[0])
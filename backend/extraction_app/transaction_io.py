@@ -0,0 +1,427 @@
+import json
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, IO, Iterable, Iterator, List, Tuple
+
+from django.db import transaction as db_transaction
+from django.db.models import QuerySet
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+from .dedup import (
+    account_key, count_stored, existing_fingerprints, fallback_account_key, fingerprint_transactions
+)
+from .models import PDFDocument, Transaction
+from .partitioning import ensure_month_partitions
+from .pipeline import BULK_CREATE_BATCH_SIZE, build_transactions
+
+READ_SIZE = 1 << 20
+EXPORT_CHUNK_SIZE = 10000
+MAX_AMOUNT = Decimal('9999999999.99')
+CATEGORIES = {category for category, _ in Transaction.CATEGORY_CHOICES}
+TRANSACTION_TYPES = {transaction_type for transaction_type, _ in Transaction.TYPE_CHOICES}
+FINGERPRINT_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+NON_WHITESPACE = re.compile(r'\S')
+VALUE_END = re.compile(r'[\s,\]}]')
+STRUCTURE = re.compile(r'[\[{}]')
+DATE_PATTERN = re.compile(r'^(\d{4})-(\d{2})-(\d{2})')
+DECODER = json.JSONDecoder()
+
+# Exported columns, in the order of the values_list query below
+EXPORT_FIELDS = [
+    'date', 'description', 'amount', 'category', 'transaction_type', 'confidence_score', 'fingerprint',
+    'document__filename', 'document__bank_type', 'document__account_type', 'document__account_number'
+]
+
+
+class _Buffer:
+    """Sliding text window over a stream, refilled as values are decoded"""
+
+    def __init__(self, stream: IO[str], read_size: int):
+        self.stream = stream
+        self.read_size = read_size
+        self.text = ''
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        chunk = self.stream.read(self.read_size)
+        if not chunk:
+            return False
+        # Drop what has been consumed so memory stays bounded by one record
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or '' at the end of the stream"""
+        while True:
+            match = NON_WHITESPACE.search(self.text, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.text[self.pos]
+            self.pos = len(self.text)
+            if not self._fill():
+                return ''
+
+    def expect(self, characters: str) -> str:
+        char = self.peek()
+        if not char or char not in characters:
+            raise ValueError(f'Expected one of {characters!r} in JSON input, got {char or "end of file"!r}')
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        """Decode the value at the current position, reading more input until it is complete"""
+        self.peek()
+        # A number or literal is only complete once something follows it
+        if self.text[self.pos] not in '"[{':
+            while not VALUE_END.search(self.text, self.pos) and self._fill():
+                pass
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            self.pos = end
+            return value
+
+    def object_is_flat(self) -> bool:
+        """
+        Whether the object at the current position appears to close before any
+        nested array or object opens. Braces inside strings can make this
+        wrong, which only costs decoding that object in one piece.
+        """
+        while True:
+            match = STRUCTURE.search(self.text, self.pos + 1)
+            if match:
+                return match.group() == '}'
+            if not self._fill():
+                return True
+
+
+def _records(value: Any, in_array: bool) -> Iterator[Dict[str, Any]]:
+    """Records inside an already decoded value, by the same rules as _walk"""
+    if isinstance(value, dict):
+        fields = {}
+        nested = False
+        for key, item in value.items():
+            if isinstance(item, (dict, list)):
+                for record in _records(item, False):
+                    nested = True
+                    yield record
+            else:
+                fields[key] = item
+        if in_array and not nested:
+            yield fields
+    elif isinstance(value, list):
+        for item in value:
+            yield from _records(item, True)
+
+
+def _walk_object(buffer: _Buffer, in_array: bool) -> Iterator[Dict[str, Any]]:
+    """
+    Walk the object at the current position key by key. An array element
+    whose values hold no records is itself a record of its scalar fields;
+    any other object is only a container for the records nested in it.
+    """
+    buffer.expect('{')
+    fields = {}
+    nested = False
+    if buffer.peek() == '}':
+        buffer.pos += 1
+    else:
+        while True:
+            key = buffer.decode()
+            if not isinstance(key, str):
+                raise ValueError('Expected a string key in JSON input')
+            buffer.expect(':')
+            if buffer.peek() in '[{':
+                for record in _walk(buffer):
+                    nested = True
+                    yield record
+            else:
+                fields[key] = buffer.decode()
+            if buffer.expect(',}') == '}':
+                break
+    if in_array and not nested:
+        yield fields
+
+
+def _walk(buffer: _Buffer, in_array: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield the records in the value at the current position"""
+    char = buffer.peek()
+    if char == '{' and in_array and buffer.object_is_flat():
+        # Fast path for the common case: a record of scalar fields
+        yield from _records(buffer.decode(), True)
+    elif char == '{':
+        yield from _walk_object(buffer, in_array)
+    elif char == '[':
+        buffer.pos += 1
+        if buffer.peek() == ']':
+            buffer.pos += 1
+            return
+        while True:
+            yield from _walk(buffer, in_array=True)
+            if buffer.expect(',]') == ']':
+                return
+    else:
+        buffer.decode()
+
+
+def iter_json_records(stream: IO[str], read_size: int = READ_SIZE) -> Iterator[Any]:
+    """
+    Stream the records of a JSON document: the objects in a top-level array,
+    or in arrays nested anywhere inside other objects (such as
+    {"sample_transactions": [...]} or {"statements": [{"transactions": [...]}]}).
+    Records keep their scalar fields; other values are skipped. The input is
+    read `read_size` characters at a time and values are decoded one at a time
+    with raw_decode, so only one record is held in memory.
+    """
+    buffer = _Buffer(stream, read_size)
+    while buffer.peek():
+        yield from _walk(buffer)
+
+
+def iter_ndjson_records(stream: IO[str]) -> Iterator[Any]:
+    """Stream one JSON value per non-empty line"""
+    loads = orjson.loads if orjson is not None else json.loads
+    for line in stream:
+        if line.strip():
+            yield loads(line)
+
+
+def clean_record(record: Any, defaults: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Validate an imported record and normalize it to the parsed transaction
+    shape used by the pipeline. `defaults` supplies source, bank_type,
+    account_type and account_number for records without them. A missing or
+    unknown category is returned as None for the classifier. Raises ValueError.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('record is not an object')
+
+    date = record.get('date')
+    match = DATE_PATTERN.match(date) if isinstance(date, str) else None
+    try:
+        date = datetime(*map(int, match.groups())).date().isoformat()
+    except (AttributeError, ValueError):
+        raise ValueError(f'invalid date {date!r}')
+
+    description = record.get('description')
+    if not isinstance(description, str) or not description.strip():
+        raise ValueError('missing description')
+
+    amount = record.get('amount')
+    try:
+        if isinstance(amount, bool):
+            raise InvalidOperation
+        amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'invalid amount {amount!r}')
+    if not amount.is_finite() or abs(amount) > MAX_AMOUNT:
+        raise ValueError(f'invalid amount {amount}')
+
+    transaction_type = record.get('type', record.get('transaction_type'))
+    if not isinstance(transaction_type, str) or transaction_type not in TRANSACTION_TYPES:
+        transaction_type = 'debit' if amount < 0 else 'credit'
+
+    category = record.get('category')
+    try:
+        confidence_score = min(max(round(float(record.get('confidence_score', 0.5)), 2), 0.0), 1.0)
+    except (TypeError, ValueError):
+        confidence_score = 0.5
+
+    fingerprint = record.get('fingerprint')
+    return {
+        'date': date,
+        'description': description.strip(),
+        'amount': amount,
+        'type': transaction_type,
+        'category': category if isinstance(category, str) and category in CATEGORIES else None,
+        'confidence_score': confidence_score,
+        'fingerprint': fingerprint if isinstance(fingerprint, str) and FINGERPRINT_PATTERN.match(fingerprint) else None,
+        'source': str(record.get('source') or defaults['source'])[:255],
+        'bank_type': str(record.get('bank_type') or defaults['bank_type'])[:50],
+        'account_type': str(record.get('account_type') or defaults['account_type'])[:20],
+        'account_number': str(record.get('account_number') or defaults.get('account_number', ''))[:34],
+    }
+
+
+class TransactionImporter:
+    """
+    Validate, classify and bulk insert streamed transaction records in
+    batches. Records are grouped into one PDFDocument per (source, bank_type,
+    account_type, account_number), created when its first new transaction is
+    written. Transactions already stored are skipped by fingerprint, so an
+    interrupted import can be run again.
+    """
+
+    def __init__(self, classifier, defaults: Dict[str, str], batch_size: int = 5000):
+        self.classifier = classifier
+        self.defaults = defaults
+        self.batch_size = batch_size
+        self.documents: Dict[Tuple[str, str, str, str], PDFDocument] = {}
+        # Repeat counters per document, carried across batches
+        self.seen: Dict[Tuple[str, str, str, str], Dict] = {}
+        self.fallback_seen: Dict[Tuple[str, str, str, str], Dict] = {}
+        self.stats = {'read': 0, 'invalid': 0, 'classified': 0, 'created': 0, 'duplicates': 0, 'documents': 0}
+
+    def run(self, records: Iterable[Any], on_invalid=None, on_batch=None) -> Dict[str, int]:
+        """
+        Import every record. `on_invalid(number, error)` is called for each
+        rejected record and `on_batch(stats)` after each batch is written.
+        """
+        batch = []
+        for number, record in enumerate(records, 1):
+            self.stats['read'] += 1
+            try:
+                batch.append(clean_record(record, self.defaults))
+            except ValueError as e:
+                self.stats['invalid'] += 1
+                if on_invalid:
+                    on_invalid(number, e)
+                continue
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                batch = []
+                if on_batch:
+                    on_batch(self.stats)
+        if batch:
+            self._write_batch(batch)
+            if on_batch:
+                on_batch(self.stats)
+        return self.stats
+
+    def _classify(self, batch: List[Dict[str, Any]]) -> None:
+        missing = [index for index, record in enumerate(batch) if record['category'] is None]
+        if not missing:
+            return
+        classified = self.classifier.classify_transactions([batch[index] for index in missing])
+        for index, result in zip(missing, classified):
+            batch[index] = result
+        self.stats['classified'] += len(missing)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        self._classify(batch)
+
+        groups: Dict[Tuple[str, str, str, str], List[Dict[str, Any]]] = {}
+        for record in batch:
+            key = (record['source'], record['bank_type'], record['account_type'], record['account_number'])
+            groups.setdefault(key, []).append(record)
+
+        pending = []
+        for key, records in groups.items():
+            _, bank_type, account_type, account_number = key
+            computed = fingerprint_transactions(
+                account_key(bank_type, account_type, account_number), records, self.seen.setdefault(key, {})
+            )
+            fingerprints = [record['fingerprint'] or fingerprint for record, fingerprint in zip(records, computed)]
+            fallback = None
+            fallback_account = fallback_account_key(bank_type, account_type, account_number)
+            if fallback_account:
+                fallback = fingerprint_transactions(fallback_account, records, self.fallback_seen.setdefault(key, {}))
+            existing = existing_fingerprints(fingerprints, fallback)
+            new_transactions = []
+            for fingerprint, record in zip(fingerprints, records):
+                if fingerprint in existing:
+                    self.stats['duplicates'] += 1
+                else:
+                    # Repeats of a fingerprint inside the batch are dropped by ignore_conflicts
+                    existing.add(fingerprint)
+                    new_transactions.append((fingerprint, record))
+            if new_transactions:
+                pending.append((key, new_transactions))
+        if not pending:
+            return
+
+        # Monthly partitions (PostgreSQL only) are created before the insert transaction
+        ensure_month_partitions(
+            datetime.strptime(record['date'], '%Y-%m-%d').date()
+            for _, new_transactions in pending for _, record in new_transactions
+        )
+
+        with db_transaction.atomic():
+            transaction_objects = []
+            for key, new_transactions in pending:
+                transaction_objects.extend(build_transactions(self._document(key), new_transactions))
+            Transaction.objects.bulk_create(
+                transaction_objects, batch_size=BULK_CREATE_BATCH_SIZE, ignore_conflicts=True
+            )
+            # ignore_conflicts drops rows a concurrent import or upload stored first
+            created = count_stored(
+                [row.fingerprint for row in transaction_objects], {row.document_id for row in transaction_objects}
+            )
+        self.stats['created'] += created
+        self.stats['duplicates'] += len(transaction_objects) - created
+
+    def _document(self, key: Tuple[str, str, str, str]) -> PDFDocument:
+        document = self.documents.get(key)
+        if document is None:
+            source, bank_type, account_type, account_number = key
+            # No page text is stored, so imported documents are never reprocessed
+            document = self.documents[key] = PDFDocument.objects.create(
+                filename=source,
+                file_size=0,
+                processed=True,
+                bank_type=bank_type,
+                account_type=account_type,
+                account_number=account_number
+            )
+            self.stats['documents'] += 1
+        return document
+
+
+def export_records(queryset: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Stream transactions as import records, fetched with a values_list
+    iterator so only `chunk_size` rows are held at a time. The fingerprint is
+    exported so re-importing the records deduplicates exactly.
+    """
+    rows = queryset.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for (date, description, amount, category, transaction_type, confidence_score, fingerprint,
+         source, bank_type, account_type, account_number) in rows:
+        yield {
+            'date': date.isoformat(),
+            'description': description,
+            'amount': float(amount),
+            'category': category,
+            'type': transaction_type,
+            'confidence_score': float(confidence_score),
+            'fingerprint': fingerprint,
+            'source': source,
+            'bank_type': bank_type,
+            'account_type': account_type,
+            'account_number': account_number,
+        }
+
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_records(records: Iterable[Dict[str, Any]], stream: IO[bytes], ndjson: bool = False) -> int:
+    """
+    Write records to a binary stream as NDJSON, or as one
+    {"transactions": [...]} document that iter_json_records reads back.
+    Returns the number of records written.
+    """
+    count = 0
+    if not ndjson:
+        stream.write(b'{"transactions": [\n')
+    for record in records:
+        if ndjson:
+            stream.write(_dumps(record) + b'\n')
+        else:
+            stream.write((b',\n' if count else b'') + _dumps(record))
+        count += 1
+    if not ndjson:
+        stream.write(b'\n]}\n')
+    return count
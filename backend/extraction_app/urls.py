@@ -3,6 +3,14 @@ from . import views
 
 urlpatterns = [
     path('upload-pdf/', views.upload_pdf, name='upload_pdf'),
+    path('uploads/', views.upload_init, name='upload_init'),
+    path('uploads/<uuid:upload_id>/', views.upload_status, name='upload_status'),
+    path('uploads/<uuid:upload_id>/chunk/', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.upload_complete, name='upload_complete'),
     path('search-transactions/', views.search_transactions, name='search_transactions'),
+    path('analytics/', views.analytics, name='analytics'),
     path('categories/', views.transaction_categories, name='transaction_categories'),
+    path('bank-types/', views.bank_types, name='bank_types'),
+    path('classifier-stats/', views.classifier_stats, name='classifier_stats'),
+    path('reprocess/', views.reprocess, name='reprocess'),
 ]
\ No newline at end of file
@@ -1,19 +1,24 @@
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.conf import settings
 from django.core.files.storage import FileSystemStorage
 import os
 import json
-from datetime import datetime
 from typing import List, Dict
 
-from .models import PDFDocument, Transaction
-from .serializers import TransactionSerializer
-from .ml_services.pdf_extractor import PDFExtractor
-from .ml_services.transaction_parser import TransactionParser
-from .ml_services.category_classifier import CategoryClassifier
+from .models import PDFDocument, Transaction, UploadSession
+from .serializers import serialize_transaction_rows
+from .cache import cached
+from .pipeline import extract_statement_pages, analyze_pages, store_statement, record_failed_statement
+from .extraction_pool import ExtractionError
+from .profiling import profiled
+from .reprocess import stale_documents, reprocess_documents
+from . import chunked_upload
+from .ml_services.merchant_normalizer import merchant_cache
 
 @api_view(['POST'])
+@profiled
 def upload_pdf(request):
     if 'file' not in request.FILES:
         return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
@@ -27,49 +32,34 @@ def upload_pdf(request):
     filename = fs.save(file.name, file)
     file_path = fs.path(filename)
     
+    return _process_pdf(file_path, file.name, file.size)
+
+def _process_pdf(file_path: str, filename: str, file_size: int) -> Response:
+    """Extract, parse, classify and store a saved PDF, removing it afterwards"""
     try:
-        # Extract text from PDF
-        extractor = PDFExtractor()
-        extracted_text = extractor.extract_text(file_path)
-        
-        # Detect bank type
-        bank_type = extractor.detect_bank(extracted_text)
-        account_type = extractor.detect_account_type(extracted_text)
-        
-        # Parse transactions based on bank type
-        parser = TransactionParser()
-        raw_transactions = parser.parse_transactions(extracted_text, bank_type)
+        try:
+            pages = extract_statement_pages(file_path)
+        except ExtractionError as e:
+            document = record_failed_statement(filename, file_size, e)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            return Response({
+                'error': str(e),
+                'status': e.status,
+                'document_id': document.id,
+                'filename': filename
+            }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
         
-        # Classify categories
-        classifier = CategoryClassifier()
-        classified_transactions = classifier.classify_transactions(raw_transactions)
-        
-        # Create PDF document record
-        document = PDFDocument.objects.create(
-            filename=file.name,
-            file_size=file.size,
-            processed=True,
-            bank_type=bank_type,
-            account_type=account_type
+        result = analyze_pages(
+            pages,
+            model_path=settings.CATEGORY_MODEL_PATH,
+            min_model_confidence=settings.CATEGORY_MODEL_MIN_CONFIDENCE
         )
-        
-        # Create transaction records
-        transactions_created = 0
-        for transaction_data in classified_transactions:
-            try:
-                Transaction.objects.create(
-                    document=document,
-                    date=datetime.strptime(transaction_data['date'], '%Y-%m-%d').date(),
-                    description=transaction_data['description'],
-                    amount=transaction_data['amount'],
-                    category=transaction_data['category'],
-                    transaction_type=transaction_data['type'],
-                    confidence_score=transaction_data.get('confidence_score', 0.5)
-                )
-                transactions_created += 1
-            except Exception as e:
-                print(f"Error creating transaction: {e}")
-                continue
+        document, transactions_created, duplicates_skipped = store_statement(filename, file_size, result)
+        bank_type = result['bank_type']
+        account_type = result['account_type']
+        header = result['header']
+        classified_transactions = result['transactions']
         
         # Generate summary statistics
         summary = _generate_transaction_summary(classified_transactions)
@@ -80,10 +70,17 @@ def upload_pdf(request):
         
         return Response({
             'message': f'Successfully processed PDF and extracted {transactions_created} transactions',
-            'filename': file.name,
+            'filename': filename,
+            'document_id': document.id,
             'bank_type': bank_type,
             'account_type': account_type,
+            'account_number': header['account_number'],
+            'statement_period': {'from': header['period_start'], 'to': header['period_end']},
+            'opening_balance': header['opening_balance'],
+            'closing_balance': header['closing_balance'],
+            'balance_check': result['balance_check'],
             'transactions_extracted': transactions_created,
+            'duplicates_skipped': duplicates_skipped,
             'summary': summary,
             'sample_transactions': classified_transactions[:10]  # Return first 10 as sample
         })
@@ -120,62 +117,237 @@ def _generate_transaction_summary(transactions: List[Dict]) -> Dict:
     }
 
 @api_view(['POST'])
+@profiled
 def search_transactions(request):
     try:
-        transactions = Transaction.objects.all()
-        
-        # Filter by date range
-        date_from = request.data.get('date_from')
-        date_to = request.data.get('date_to')
-        
-        if date_from:
-            transactions = transactions.filter(date__gte=date_from)
-        if date_to:
-            transactions = transactions.filter(date__lte=date_to)
-        
-        # Filter by category
-        category = request.data.get('category')
-        if category:
-            transactions = transactions.filter(category=category)
-        
-        # Filter by amount range
-        min_amount = request.data.get('min_amount')
-        max_amount = request.data.get('max_amount')
-        
-        if min_amount:
-            transactions = transactions.filter(amount__gte=min_amount)
-        if max_amount:
-            transactions = transactions.filter(amount__lte=max_amount)
-        
-        # Filter by transaction type
-        transaction_type = request.data.get('transaction_type')
-        if transaction_type:
-            if transaction_type == 'credit':
-                transactions = transactions.filter(amount__gt=0)
-            elif transaction_type == 'debit':
-                transactions = transactions.filter(amount__lt=0)
-        
-        # Filter by bank type
-        bank_type = request.data.get('bank_type')
-        if bank_type:
-            transactions = transactions.filter(document__bank_type=bank_type)
-        
-        serializer = TransactionSerializer(transactions, many=True)
-        return Response({
-            'transactions': serializer.data,
-            'count': len(serializer.data)
-        })
+        result = cached(
+            'search_transactions',
+            lambda: _search_transactions(request.data),
+            payload=request.data
+        )
+        return Response(result)
         
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _search_transactions(filters) -> Dict:
+    """Run the transaction search for a set of filters"""
+    transactions = Transaction.objects.all()
+    
+    # Filter by date range
+    date_from = filters.get('date_from')
+    date_to = filters.get('date_to')
+    
+    if date_from:
+        transactions = transactions.filter(date__gte=date_from)
+    if date_to:
+        transactions = transactions.filter(date__lte=date_to)
+    
+    # Filter by category
+    category = filters.get('category')
+    if category:
+        transactions = transactions.filter(category=category)
+    
+    # Filter by amount range
+    min_amount = filters.get('min_amount')
+    max_amount = filters.get('max_amount')
+    
+    if min_amount:
+        transactions = transactions.filter(amount__gte=min_amount)
+    if max_amount:
+        transactions = transactions.filter(amount__lte=max_amount)
+    
+    # Filter by transaction type
+    transaction_type = filters.get('transaction_type')
+    if transaction_type:
+        if transaction_type == 'credit':
+            transactions = transactions.filter(amount__gt=0)
+        elif transaction_type == 'debit':
+            transactions = transactions.filter(amount__lt=0)
+    
+    # Filter by bank type
+    bank_type = filters.get('bank_type')
+    if bank_type:
+        transactions = transactions.filter(document__bank_type=bank_type)
+    
+    data = serialize_transaction_rows(transactions)
+    return {
+        'transactions': data,
+        'count': len(data)
+    }
+
+@api_view(['GET'])
+@profiled
+def analytics(request):
+    """
+    Recurring payments and monthly cash flow per category, optionally limited
+    by date_from, date_to and bank_type query parameters
+    """
+    filters = {key: request.query_params.get(key) for key in ('date_from', 'date_to', 'bank_type')}
+    try:
+        result = cached('analytics', lambda: _transaction_analytics(filters), payload=filters)
+        return Response(result)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _transaction_analytics(filters) -> Dict:
+    # pandas is only imported by processes that serve analytics
+    from .analytics import transaction_analytics
+    
+    transactions = Transaction.objects.all()
+    if filters.get('date_from'):
+        transactions = transactions.filter(date__gte=filters['date_from'])
+    if filters.get('date_to'):
+        transactions = transactions.filter(date__lte=filters['date_to'])
+    if filters.get('bank_type'):
+        transactions = transactions.filter(document__bank_type=filters['bank_type'])
+    return transaction_analytics(transactions, chunk_size=settings.ANALYTICS_CHUNK_SIZE)
+
 @api_view(['GET'])
 def transaction_categories(request):
-    categories = dict(Transaction.CATEGORY_CHOICES)
+    categories = cached(
+        'transaction_categories',
+        lambda: dict(Transaction.CATEGORY_CHOICES),
+        versioned=False
+    )
     return Response({'categories': categories})
 
 @api_view(['GET'])
 def bank_types(request):
     """Get unique bank types from processed documents"""
-    bank_types = PDFDocument.objects.values_list('bank_type', flat=True).distinct()
-    return Response({'bank_types': list(bank_types)})
\ No newline at end of file
+    bank_types = cached(
+        'bank_types',
+        lambda: list(PDFDocument.objects.values_list('bank_type', flat=True).distinct())
+    )
+    return Response({'bank_types': bank_types})
+
+@api_view(['GET'])
+def classifier_stats(request):
+    """Hit-rate statistics of the merchant classification memo in this process"""
+    return Response({'merchant_cache': merchant_cache.stats()})
+
+@api_view(['POST'])
+def reprocess(request):
+    """Re-parse stale documents (or the given document_ids) from their stored page text"""
+    try:
+        documents = stale_documents()
+        document_ids = request.data.get('document_ids')
+        if document_ids:
+            documents = documents.filter(id__in=document_ids)
+        reports = reprocess_documents(documents.order_by('id'), workers=settings.REPROCESS_WORKERS)
+        return Response({
+            'documents_reprocessed': len(reports),
+            'documents': reports
+        })
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _upload_session_data(session: UploadSession) -> Dict:
+    return {
+        'upload_id': str(session.id),
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'received_bytes': session.received_bytes,
+        'status': session.status,
+        'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE
+    }
+
+@api_view(['POST'])
+def upload_init(request):
+    """Start a resumable chunked upload"""
+    filename = os.path.basename(str(request.data.get('filename', '')))
+    try:
+        total_size = int(request.data.get('total_size'))
+    except (TypeError, ValueError):
+        return Response({'error': 'total_size is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not filename.lower().endswith('.pdf'):
+        return Response({'error': 'File must be a PDF'}, status=status.HTTP_400_BAD_REQUEST)
+    if total_size <= 0 or total_size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        return Response({'error': f'File size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    session = UploadSession.objects.create(filename=filename, total_size=total_size)
+    return Response(_upload_session_data(session), status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+def upload_status(request, upload_id):
+    """Report how many bytes have been received, so a client can resume"""
+    try:
+        session = UploadSession.objects.get(id=upload_id)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Unknown upload'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_upload_session_data(session))
+
+@api_view(['PUT'])
+def upload_chunk(request, upload_id):
+    """
+    Append the raw request body at ?offset=N. A chunk at the wrong offset gets
+    409 with the offset the server expects.
+    """
+    try:
+        session = UploadSession.objects.get(id=upload_id, status='open')
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Unknown or closed upload'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        offset = int(request.query_params.get('offset', session.received_bytes))
+        received = chunked_upload.write_chunk(session, offset, request.stream)
+    except chunked_upload.ChunkOffsetMismatch as e:
+        return Response({'error': str(e), 'received_bytes': e.expected_offset}, status=status.HTTP_409_CONFLICT)
+    except chunked_upload.UploadClosed as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({'upload_id': str(session.id), 'received_bytes': received, 'total_size': session.total_size})
+
+@api_view(['POST'])
+@profiled
+def upload_complete(request, upload_id):
+    """
+    Verify the assembled file and run extraction on it. Relays that stream a
+    file of unknown length declare an upper bound at init and confirm the
+    real size here as `total_size`.
+    """
+    try:
+        session = UploadSession.objects.get(id=upload_id, status='open')
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Unknown or closed upload'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if request.data.get('total_size') is not None:
+        try:
+            final_size = int(request.data.get('total_size'))
+        except (TypeError, ValueError):
+            return Response({'error': 'total_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if 0 < final_size < session.total_size:
+            session.total_size = final_size
+            UploadSession.objects.filter(id=session.id).update(total_size=final_size)
+    
+    if session.received_bytes != session.total_size:
+        return Response({
+            'error': 'Upload is incomplete',
+            'received_bytes': session.received_bytes,
+            'total_size': session.total_size
+        }, status=status.HTTP_409_CONFLICT)
+    
+    digest = chunked_upload.finish_digest(session)
+    expected = str(request.data.get('sha256', '')).lower()
+    if expected and expected != digest:
+        chunked_upload.discard(session)
+        session.status = 'failed'
+        session.save(update_fields=['status', 'updated_at'])
+        return Response({'error': 'SHA-256 mismatch', 'sha256': digest}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Close the session first so a concurrent complete or chunk cannot reuse it
+    if not UploadSession.objects.filter(id=session.id, status='open').update(status='completed', sha256=digest):
+        return Response({'error': 'Unknown or closed upload'}, status=status.HTTP_404_NOT_FOUND)
+    
+    response = _process_pdf(chunked_upload.part_path(session), session.filename, session.total_size)
+    UploadSession.objects.filter(id=session.id).update(
+        status='completed' if response.status_code == status.HTTP_200_OK else 'failed',
+        document_id=response.data.get('document_id')
+    )
+    response.data['upload_id'] = str(session.id)
+    response.data['sha256'] = digest
+    return response
\ No newline at end of file
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'extraction_app.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +60,68 @@ DATABASES = {
     }
 }
 
+# Use PostgreSQL (requires psycopg2) when POSTGRES_DB is set. Only PostgreSQL
+# supports partitioning the transaction table by month (partition_transactions).
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+    }
+
+# Build the extraction pipeline, load the category model and start the
+# extraction workers when the WSGI application loads, so the first upload
+# a worker serves is not slowed down by them
+PIPELINE_WARMUP = False
+
+# Rows per values_list chunk loaded by the analytics endpoint
+ANALYTICS_CHUNK_SIZE = 100000
+
+# Schema that archived (detached) monthly transaction partitions are moved to
+TRANSACTION_ARCHIVE_SCHEMA = 'archive'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'TIMEOUT': 300,
+    }
+}
+
+# Response cache for categories, bank types and searches. Entries are keyed on
+# a data version that upload_pdf bumps whenever transactions are written.
+EXTRACTION_CACHE_ALIAS = 'default'
+EXTRACTION_CACHE_TIMEOUT = 300
+
+# Optional trained category model (see `manage.py train_category_model`).
+# Predictions below the confidence threshold fall back to the pattern rules.
+CATEGORY_MODEL_PATH = os.path.join(BASE_DIR, 'ml_models', 'category_model.npy')
+CATEGORY_MODEL_MIN_CONFIDENCE = 0.6
+
+# Worker processes used by the reprocess API; the reprocess_statements
+# command takes --workers instead
+REPROCESS_WORKERS = 1
+
+# PDF extraction runs in supervised worker processes. A document that exceeds
+# the wall-clock timeout or RSS cap kills its worker and is recorded with a
+# timed_out / memory_exceeded status; pages slower than the page budget are
+# skipped. Workers are recycled after a number of documents.
+EXTRACTION_ISOLATED = True
+EXTRACTION_WORKERS = 2
+EXTRACTION_TIMEOUT = 120
+EXTRACTION_MAX_RSS_MB = 1024
+EXTRACTION_PAGE_BUDGET = 15
+EXTRACTION_MAX_DOCUMENTS_PER_WORKER = 25
+
+# Per-request profiling of upload-pdf and search-transactions. When enabled,
+# requests sent with an `X-Profile: 1` header or `?profile=1` are profiled;
+# the .prof file goes to PROFILING_DIR and a summary is added to the response.
+PROFILING_ENABLED = False
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -88,10 +151,16 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'extraction_app.renderers.ORJSONRenderer',
     ],
 }
 
+# Responses larger than this are compressed with brotli or gzip when the
+# client accepts it
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+RESPONSE_COMPRESSION_GZIP_LEVEL = 6
+RESPONSE_COMPRESSION_BROTLI_QUALITY = 4
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5000",
     "http://127.0.0.1:5000",
@@ -99,3 +168,11 @@ CORS_ALLOWED_ORIGINS = [
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Resumable chunked uploads (uploads/ endpoints). Chunks are assembled into
+# CHUNKED_UPLOAD_DIR and extracted once the upload is completed.
+CHUNKED_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'chunked')
+CHUNKED_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = 512 * 1024 * 1024
+# Open uploads idle for longer than this are expired by `manage.py expire_uploads`
+CHUNKED_UPLOAD_TTL = 24 * 60 * 60
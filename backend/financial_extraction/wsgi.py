@@ -1,6 +1,12 @@
 import os
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'financial_extraction.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+if settings.PIPELINE_WARMUP:
+    # Load the pipeline and extraction workers at worker boot, not on the first upload
+    from extraction_app.pipeline import warm_up
+    warm_up()
\ No newline at end of file
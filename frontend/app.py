@@ -2,19 +2,19 @@ from flask import Flask, render_template, request, jsonify, redirect, url_for
 import requests
 import json
 import os
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import get_input_stream
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max per request; larger files are sent in chunks
+RELAY_READ_SIZE = 64 * 1024
 
 # Backend API URL
 BACKEND_URL = "http://localhost:8000/api"
 
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
 ALLOWED_EXTENSIONS = {'pdf'}
 
 def allowed_file(filename):
@@ -30,42 +30,143 @@ def upload():
 
 @app.route('/upload-file', methods=['POST'])
 def upload_file():
-    if 'file' not in request.files:
+    # The multipart body is parsed as it arrives and the file is relayed to the
+    # backend chunk by chunk, so at most one chunk is held here and the 16MB
+    # request cap does not apply
+    content_type, options = parse_options_header(request.headers.get('Content-Type', ''))
+    if content_type != 'multipart/form-data' or 'boundary' not in options:
         return jsonify({'error': 'No file selected'}), 400
+    if not request.content_length:
+        return jsonify({'error': 'Content-Length is required'}), 411
     
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
+    stream = get_input_stream(request.environ)
+    decoder = MultipartDecoder(options['boundary'].encode('latin-1'))
+    filename = session = None
+    in_file = False
+    buffer = bytearray()
+    offset = 0
     
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+    try:
+        event = decoder.next_event()
+        while not isinstance(event, Epilogue):
+            if isinstance(event, NeedData):
+                decoder.receive_data(stream.read(RELAY_READ_SIZE) or None)
+            elif isinstance(event, File) and event.name == 'file' and filename is None:
+                filename = secure_filename(event.filename or '')
+                if not filename:
+                    return jsonify({'error': 'No file selected'}), 400
+                if not allowed_file(filename):
+                    return jsonify({'error': 'Invalid file type'}), 400
+                in_file = True
+            elif isinstance(event, Data) and in_file:
+                buffer += event.data
+                in_file = event.more_data
+                if session is None and buffer:
+                    # The file's length is not known until its part ends, so
+                    # the request length is declared as an upper bound
+                    response = requests.post(f"{BACKEND_URL}/uploads/",
+                                             json={'filename': filename, 'total_size': request.content_length})
+                    if response.status_code != 201:
+                        return _backend_error(response)
+                    session = response.json()
+                while buffer and (len(buffer) >= session['chunk_size'] or not in_file):
+                    chunk = bytes(buffer[:session['chunk_size']])
+                    del buffer[:session['chunk_size']]
+                    response = requests.put(
+                        f"{BACKEND_URL}/uploads/{session['upload_id']}/chunk/",
+                        params={'offset': offset}, data=chunk,
+                        headers={'Content-Type': 'application/octet-stream'}
+                    )
+                    if response.status_code != 200:
+                        return _backend_error(response)
+                    offset = response.json()['received_bytes']
+            event = decoder.next_event()
+        
+        if session is None or offset == 0:
+            return jsonify({'error': 'No file selected'}), 400
         
-        # Send to backend for processing
-        try:
-            with open(filepath, 'rb') as f:
-                files = {'file': (filename, f, 'application/pdf')}
-                response = requests.post(f"{BACKEND_URL}/upload-pdf/", files=files)
-            
-            if response.status_code == 200:
-                result = response.json()
-                return jsonify({
-                    'success': True,
-                    'message': 'File uploaded and processed successfully',
-                    'data': result
-                })
-            else:
-                return jsonify({'error': 'Backend processing failed'}), 500
-                
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
-        finally:
-            # Clean up uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        response = requests.post(f"{BACKEND_URL}/uploads/{session['upload_id']}/complete/", json={'total_size': offset})
+        return _processing_result(response)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Chunked upload relay used by the upload page: the browser slices the file,
+# each chunk is streamed through to the backend, and an interrupted upload
+# resumes from the backend's received_bytes.
+
+class _RelayStream:
+    """Request body stream with a known length, so requests sends it unbuffered"""
+    
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.length = length
+    
+    def __len__(self):
+        return self.length
+    
+    def __iter__(self):
+        return iter(lambda: self.read(64 * 1024), b'')
     
-    return jsonify({'error': 'Invalid file type'}), 400
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+def _backend_error(response):
+    try:
+        data = response.json()
+    except ValueError:
+        data = {'error': 'Backend processing failed'}
+    return jsonify(data), response.status_code
+
+def _processing_result(response):
+    if response.status_code == 200:
+        return jsonify({
+            'success': True,
+            'message': 'File uploaded and processed successfully',
+            'data': response.json()
+        })
+    return _backend_error(response)
+
+@app.route('/upload-init', methods=['POST'])
+def upload_init():
+    data = request.json or {}
+    filename = secure_filename(data.get('filename', ''))
+    if not allowed_file(filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    try:
+        response = requests.post(f"{BACKEND_URL}/uploads/", json={'filename': filename, 'total_size': data.get('total_size')})
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload-status/<upload_id>')
+def upload_status(upload_id):
+    try:
+        response = requests.get(f"{BACKEND_URL}/uploads/{upload_id}/")
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload-chunk/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    try:
+        response = requests.put(
+            f"{BACKEND_URL}/uploads/{upload_id}/chunk/",
+            params={'offset': request.args.get('offset', 0)},
+            data=_RelayStream(request.stream, request.content_length or 0),
+            headers={'Content-Type': 'application/octet-stream'}
+        )
+        return jsonify(response.json()), response.status_code
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload-complete/<upload_id>', methods=['POST'])
+def upload_complete(upload_id):
+    try:
+        response = requests.post(f"{BACKEND_URL}/uploads/{upload_id}/complete/", json=request.json or {})
+        return _processing_result(response)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/query')
 def query():
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""
+Load generator for the extraction backend.
+
+Replays uploads of the sample statements in data/sample_pdfs mixed with
+search-transactions queries against a running backend (runserver or gunicorn)
+at one or more concurrency levels, and reports throughput and p50/p95/p99
+latency per endpoint. Results are saved as JSON so runs can be compared.
+
+    python tools/loadtest.py --concurrency 1,4,16 --duration 30
+    python tools/loadtest.py --compare data/loadtest/<previous>.json
+
+Only the standard library is used so it runs from any environment.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PDF_DIR = os.path.join(ROOT_DIR, 'data', 'sample_pdfs')
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, 'data', 'loadtest')
+
+CATEGORIES = ['food', 'shopping', 'transport', 'entertainment', 'bills',
+              'income', 'transfer', 'healthcare', 'business', 'other']
+
+
+def _multipart_body(filename, content):
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        f'--{boundary}\r\n'.encode(),
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode(),
+        b'Content-Type: application/pdf\r\n\r\n',
+        content,
+        f'\r\n--{boundary}--\r\n'.encode(),
+    ])
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def _random_search_filters(rng):
+    """A mix of filter combinations resembling the query page"""
+    filters = {}
+    if rng.random() < 0.5:
+        start = date(2023, 1, 1) + timedelta(days=rng.randrange(0, 600))
+        filters['date_from'] = start.isoformat()
+        filters['date_to'] = (start + timedelta(days=rng.choice([7, 30, 90, 365]))).isoformat()
+    if rng.random() < 0.4:
+        filters['category'] = rng.choice(CATEGORIES)
+    if rng.random() < 0.3:
+        filters['transaction_type'] = rng.choice(['credit', 'debit'])
+    if rng.random() < 0.2:
+        filters['min_amount'] = rng.choice([-5000, -1000, 0, 100])
+    return filters
+
+
+class LoadTest:
+    def __init__(self, base_url, pdfs, upload_weight, search_weight, timeout, seed):
+        self.base_url = base_url.rstrip('/')
+        self.pdfs = pdfs
+        self.upload_weight = upload_weight
+        self.search_weight = search_weight
+        self.timeout = timeout
+        self.seed = seed
+        self.lock = threading.Lock()
+
+    def _request(self, path, body, content_type):
+        request = urllib.request.Request(
+            f'{self.base_url}/{path}', data=body, method='POST',
+            headers={'Content-Type': content_type, 'Accept-Encoding': 'gzip'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except Exception:
+            return 0
+
+    def _upload(self, rng):
+        filename, content = rng.choice(self.pdfs)
+        body, content_type = _multipart_body(filename, content)
+        return self._request('upload-pdf/', body, content_type)
+
+    def _search(self, rng):
+        body = json.dumps(_random_search_filters(rng)).encode()
+        return self._request('search-transactions/', body, 'application/json')
+
+    def run_stage(self, concurrency, duration):
+        """Run the traffic mix at a fixed concurrency for `duration` seconds"""
+        samples = []
+        deadline = time.monotonic() + duration
+        total_weight = self.upload_weight + self.search_weight
+
+        def worker(index):
+            rng = random.Random(self.seed * 1000 + index)
+            local = []
+            while time.monotonic() < deadline:
+                is_upload = self.pdfs and rng.random() * total_weight < self.upload_weight
+                endpoint = 'upload-pdf' if is_upload else 'search-transactions'
+                start = time.perf_counter()
+                status = self._upload(rng) if is_upload else self._search(rng)
+                local.append((endpoint, time.perf_counter() - start, status))
+            with self.lock:
+                samples.extend(local)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(samples, time.perf_counter() - started)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    endpoints = {}
+    for endpoint in sorted({sample[0] for sample in samples}):
+        latencies = sorted(latency for name, latency, _ in samples if name == endpoint)
+        errors = sum(1 for name, _, status in samples if name == endpoint and not 200 <= status < 300)
+        endpoints[endpoint] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput': round(len(latencies) / elapsed, 2),
+            'mean_ms': round(1000 * sum(latencies) / len(latencies), 1),
+            'p50_ms': round(1000 * _percentile(latencies, 0.50), 1),
+            'p95_ms': round(1000 * _percentile(latencies, 0.95), 1),
+            'p99_ms': round(1000 * _percentile(latencies, 0.99), 1),
+            'max_ms': round(1000 * latencies[-1], 1),
+        }
+    return {'elapsed_seconds': round(elapsed, 2), 'endpoints': endpoints}
+
+
+def print_stage(concurrency, stage, previous=None):
+    print(f'\nconcurrency {concurrency} ({stage["elapsed_seconds"]}s)')
+    print(f'  {"endpoint":<22}{"reqs":>7}{"errors":>8}{"req/s":>9}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+    for endpoint, stats in stage['endpoints'].items():
+        line = (f'  {endpoint:<22}{stats["requests"]:>7}{stats["errors"]:>8}{stats["throughput"]:>9}'
+                f'{stats["p50_ms"]:>10}{stats["p95_ms"]:>10}{stats["p99_ms"]:>10}')
+        before = (previous or {}).get('endpoints', {}).get(endpoint)
+        if before:
+            line += (f'   (was {before["throughput"]} req/s, p95 {before["p95_ms"]} ms,'
+                     f' p99 {before["p99_ms"]} ms)')
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default=os.getenv('BACKEND_URL', 'http://localhost:8000/api'))
+    parser.add_argument('--concurrency', default='1,4,8',
+                        help='Comma-separated concurrency levels, run in order')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per concurrency level')
+    parser.add_argument('--mix', default='upload=1,search=9', help='Relative weights of upload and search requests')
+    parser.add_argument('--pdf-dir', default=DEFAULT_PDF_DIR)
+    parser.add_argument('--timeout', type=float, default=300, help='Per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    args = parser.parse_args()
+
+    weights = dict(part.split('=') for part in args.mix.split(','))
+    pdfs = []
+    for name in sorted(os.listdir(args.pdf_dir)):
+        if name.lower().endswith('.pdf'):
+            with open(os.path.join(args.pdf_dir, name), 'rb') as pdf_file:
+                pdfs.append((name, pdf_file.read()))
+
+    load_test = LoadTest(
+        args.base_url, pdfs, float(weights.get('upload', 0)), float(weights.get('search', 0)),
+        args.timeout, args.seed
+    )
+    previous = {}
+    if args.compare:
+        with open(args.compare) as compare_file:
+            previous = {stage['concurrency']: stage for stage in json.load(compare_file)['stages']}
+
+    stages = []
+    for concurrency in [int(level) for level in args.concurrency.split(',')]:
+        stage = load_test.run_stage(concurrency, args.duration)
+        stage['concurrency'] = concurrency
+        stages.append(stage)
+        print_stage(concurrency, stage, previous.get(concurrency))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f'loadtest-{time.strftime("%Y%m%d-%H%M%S")}.json')
+    with open(output_path, 'w') as output_file:
+        json.dump({
+            'base_url': args.base_url,
+            'mix': weights,
+            'duration': args.duration,
+            'pdfs': [name for name, _ in pdfs],
+            'stages': stages,
+        }, output_file, indent=2)
+    print(f'\nResults saved to {output_path}')
+
+
+if __name__ == '__main__':
+    main()